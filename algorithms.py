@@ -1,97 +1,284 @@
+import json
+import os
+import threading
 import time
 
-# Classic 3-peg Tower of Hanoi recursive solution
-def solve_hanoi_recursive(n, source, auxiliary, destination):
-    moves = []
+import numpy as np
+
+from moves import PEG_INDEX, unpack_moves
+
+# Streaming generators: each yields packed moves (see moves.py) one at a time,
+# so a caller can consume a 2^n move solution without ever holding it in memory.
+# Feed them to a sink from sinks.py, or materialize them with the solve_* functions below.
+
+# Classic 3-peg Tower of Hanoi recursive solution (streaming)
+def iter_hanoi_recursive(n, source, auxiliary, destination):
     
     def hanoi(n, source, auxiliary, destination):
         if n == 1:
-            moves.append(f"{source}->{destination}")
+            yield source << 4 | destination
             return
-        hanoi(n-1, source, destination, auxiliary)
-        moves.append(f"{source}->{destination}")
-        hanoi(n-1, auxiliary, source, destination)
-    
-    start_time = time.time()
-    hanoi(n, source, auxiliary, destination)
-    end_time = time.time()
+        yield from hanoi(n-1, source, destination, auxiliary)
+        yield source << 4 | destination
+        yield from hanoi(n-1, auxiliary, source, destination)
     
-    return moves, end_time - start_time
+    if n > 0:
+        yield from hanoi(n, PEG_INDEX[source], PEG_INDEX[auxiliary], PEG_INDEX[destination])
 
-# Classic 3-peg Tower of Hanoi iterative solution
-def solve_hanoi_iterative(n, source, auxiliary, destination):
-    moves = []
-    start_time = time.time()
-    
-    # If n is even, swap auxiliary and destination
-    if n % 2 == 0:
-        auxiliary, destination = destination, auxiliary
-    
-    total_moves = (1 << n) - 1  # 2^n - 1
+# Per-disk move cycles for the iterative solver.
+# Disk d (1 = smallest) moves at steps i = 2^(d-1) * (2j + 1) for j = 0, 1, 2, ...,
+# and always cycles through the pegs in one direction set by the parity of n - d,
+# so its j-th move is disk_cycles[d][j % 3].
+def _disk_cycles(n, source, auxiliary, destination):
+    pegs = (PEG_INDEX[source], PEG_INDEX[auxiliary], PEG_INDEX[destination])
+    forward = [pegs[p] << 4 | pegs[(p + 1) % 3] for p in range(3)]   # source -> auxiliary -> destination
+    backward = [pegs[p] << 4 | pegs[(p - 1) % 3] for p in range(3)]  # source -> destination -> auxiliary
     
-    for i in range(1, total_moves + 1):
-        if i % 3 == 1:
-            # Move between source and destination
-            if not moves or moves[-1].startswith(destination) and moves[-1].endswith(source):
-                moves.append(f"{source}->{destination}")
-            else:
-                moves.append(f"{destination}->{source}")
-        elif i % 3 == 2:
-            # Move between source and auxiliary
-            if not moves or moves[-1].startswith(auxiliary) and moves[-1].endswith(source):
-                moves.append(f"{source}->{auxiliary}")
-            else:
-                moves.append(f"{auxiliary}->{source}")
+    cycles = [None]
+    for disk in range(1, n + 1):
+        if (n - disk) & 1:
+            cycles.append(forward)
         else:
-            # Move between auxiliary and destination
-            if not moves or moves[-1].startswith(destination) and moves[-1].endswith(auxiliary):
-                moves.append(f"{auxiliary}->{destination}")
-            else:
-                moves.append(f"{destination}->{auxiliary}")
+            cycles.append([backward[-j % 3] for j in range(3)])
+    return cycles
+
+# Classic 3-peg Tower of Hanoi iterative solution (streaming)
+# Every move is derived from its step index i alone, with no lookback:
+# the disk moved is d = trailing zeros of i + 1, and it has already moved i >> d times.
+def iter_hanoi_iterative(n, source, auxiliary, destination):
+    cycles = _disk_cycles(n, source, auxiliary, destination)
+    for i in range(1, 1 << n):
+        disk = (i & -i).bit_length()
+        yield cycles[disk][(i >> disk) % 3]
+
+# Frame-Stewart split table.
+# For p pegs, FS(n, p) = min over 1 <= k < n of 2*FS(k, p) + FS(n-k, p-1), with FS(n, 3) = 2^n - 1.
+# Rows are computed once per peg count, extended on demand and shared by every solve;
+# entry n of a row is (minimal move count, best split k).
+# Rows are only extended under the lock, since sessions, jobs and the cache warmup share them;
+# a row already long enough is returned without taking it.
+_frame_stewart_tables = {}
+_frame_stewart_lock = threading.RLock()
+
+# Get the Frame-Stewart table row for a peg count, covering at least n disks
+def frame_stewart_table(n, pegs=4):
+    if pegs < 3:
+        raise ValueError("Frame-Stewart needs at least 3 pegs")
     
-    end_time = time.time()
-    return moves, end_time - start_time
+    table = _frame_stewart_tables.get(pegs)
+    if table is not None and len(table) > n:
+        return table
+    with _frame_stewart_lock:
+        return _extend_frame_stewart_table(n, pegs)
 
-# Frame-Stewart algorithm for 4 pegs
-def solve_frame_stewart(n, source, aux1, aux2, destination):
-    moves = []
-    start_time = time.time()
+def _extend_frame_stewart_table(n, pegs):
+    table = _frame_stewart_tables.setdefault(pegs, [(0, 0), (1, 0)])
+    if pegs == 3:
+        while len(table) <= n:
+            table.append(((1 << len(table)) - 1, len(table) - 1))
+        return table
     
-    # Calculate k (optimal split for Frame-Stewart)
-    k = int(n - (2*n)**(1/2))
-    if k < 1:
-        k = 1
+    fewer_pegs = frame_stewart_table(n, pegs - 1)
+    while len(table) <= n:
+        m = len(table)
+        best_count, best_split = None, 0
+        for k in range(1, m):
+            count = 2 * table[k][0] + fewer_pegs[m - k][0]
+            if best_count is None or count < best_count:
+                best_count, best_split = count, k
+        table.append((best_count, best_split))
+    return table
+
+# Minimal Frame-Stewart move count for n disks on the given number of pegs
+def frame_stewart_move_count(n, pegs=4):
+    return frame_stewart_table(n, pegs)[n][0]
+
+# Save the computed Frame-Stewart tables so later processes can skip the DP
+def save_frame_stewart_tables(path):
+    with _frame_stewart_lock, open(path, "w") as f:
+        json.dump({str(pegs): table for pegs, table in _frame_stewart_tables.items()}, f)
+
+# Load Frame-Stewart tables written by save_frame_stewart_tables; missing files are ignored
+def load_frame_stewart_tables(path):
+    if not os.path.exists(path):
+        return
+    with open(path) as f:
+        tables = json.load(f)
+    with _frame_stewart_lock:
+        for pegs, table in tables.items():
+            current = _frame_stewart_tables.get(int(pegs), [])
+            if len(table) > len(current):
+                _frame_stewart_tables[int(pegs)] = [tuple(entry) for entry in table]
+
+# Frame-Stewart algorithm for any number of pegs (streaming)
+# pegs lists the peg names as [source, auxiliaries..., destination]
+def iter_frame_stewart_pegs(n, pegs):
+    frame_stewart_table(n, len(pegs))
+    
+    def three_peg_hanoi(n, source, auxiliary, destination):
+        if n == 1:
+            yield source << 4 | destination
+            return
+        yield from three_peg_hanoi(n-1, source, destination, auxiliary)
+        yield source << 4 | destination
+        yield from three_peg_hanoi(n-1, auxiliary, source, destination)
     
-    def frame_stewart_helper(n, source, aux1, aux2, destination):
+    def frame_stewart_helper(n, source, auxiliaries, destination):
         if n == 0:
             return
         if n == 1:
-            moves.append(f"{source}->{destination}")
+            yield source << 4 | destination
+            return
+        if len(auxiliaries) == 1:
+            yield from three_peg_hanoi(n, source, auxiliaries[0], destination)
             return
         
-        # Calculate k for this recursion level
-        k = int(n - (2*n)**(1/2))
-        if k < 1:
-            k = 1
+        # Optimal split for this level, looked up in the table
+        k = _frame_stewart_tables[len(auxiliaries) + 2][n][1]
+        parking, others = auxiliaries[0], auxiliaries[1:]
         
-        # Move top k disks to aux1
-        frame_stewart_helper(k, source, destination, aux2, aux1)
-        # Move remaining n-k disks from source to destination using 3 pegs
-        three_peg_hanoi(n-k, source, aux1, aux2, destination)
-        # Move k disks from aux1 to destination
-        frame_stewart_helper(k, aux1, source, aux2, destination)
-    
-    def three_peg_hanoi(n, source, auxiliary, not_used, destination):
-        if n == 0:
-            return
+        # Move top k disks to the parking peg using every peg
+        yield from frame_stewart_helper(k, source, others + (destination,), parking)
+        # Move remaining n-k disks to the destination without touching the parking peg
+        yield from frame_stewart_helper(n-k, source, others, destination)
+        # Move k disks from the parking peg onto the destination using every peg
+        yield from frame_stewart_helper(k, parking, (source,) + others, destination)
+    
+    pegs = [PEG_INDEX[peg] for peg in pegs]
+    yield from frame_stewart_helper(n, pegs[0], tuple(pegs[1:-1]), pegs[-1])
+
+# Frame-Stewart algorithm for 4 pegs (streaming)
+def iter_frame_stewart(n, source, aux1, aux2, destination):
+    return iter_frame_stewart_pegs(n, [source, aux1, aux2, destination])
+
+# Materialize a streamed solution and time it
+def _materialize(moves, packed):
+    start_time = time.time()
+    solution = bytearray(moves)
+    end_time = time.time()
+    
+    return (solution if packed else unpack_moves(solution)), end_time - start_time
+
+# Classic 3-peg Tower of Hanoi recursive solution
+# Moves are emitted as packed bytes (see moves.py); pass packed=True to keep them packed
+# (kept as a direct append rather than draining iter_hanoi_recursive, which pays for n nested generators per move)
+def solve_hanoi_recursive(n, source, auxiliary, destination, packed=False):
+    moves = bytearray()
+    
+    def hanoi(n, source, auxiliary, destination):
         if n == 1:
-            moves.append(f"{source}->{destination}")
+            moves.append(source << 4 | destination)
             return
-        three_peg_hanoi(n-1, source, not_used, auxiliary, auxiliary)
-        moves.append(f"{source}->{destination}")
-        three_peg_hanoi(n-1, auxiliary, source, not_used, destination)
+        hanoi(n-1, source, destination, auxiliary)
+        moves.append(source << 4 | destination)
+        hanoi(n-1, auxiliary, source, destination)
     
-    frame_stewart_helper(n, source, aux1, aux2, destination)
+    start_time = time.time()
+    hanoi(n, PEG_INDEX[source], PEG_INDEX[auxiliary], PEG_INDEX[destination])
     end_time = time.time()
     
-    return moves, end_time - start_time
\ No newline at end of file
+    return (moves if packed else unpack_moves(moves)), end_time - start_time
+
+# Moves per slice assignment in fill_hanoi_iterative (a multiple of 3, so each block starts on a cycle)
+FILL_BLOCK = 3 << 18
+
+# Write the classic 3-peg solution into a writable buffer of 2^n - 1 bytes (a bytearray, or a
+# memoryview such as a shared memory block). Because each disk's moves sit at a fixed stride and
+# repeat every three moves, each disk is written with a few strided slice assignments instead of a
+# loop per move; the repeated pattern is at most FILL_BLOCK bytes, so no copy of the solution is made.
+# Writes go through a NumPy view, whose strided assignment is fast for any buffer type.
+def fill_hanoi_iterative(out, n, source, auxiliary, destination):
+    out = np.frombuffer(out, dtype=np.uint8)
+    cycles = _disk_cycles(n, source, auxiliary, destination)
+    total_moves = (1 << n) - 1  # 2^n - 1
+    for disk in range(1, n + 1):
+        first, stride = (1 << (disk - 1)) - 1, 1 << disk
+        count = (total_moves - first + stride - 1) // stride
+        pattern = np.frombuffer(bytes(cycles[disk]) * min(count // 3 + 1, FILL_BLOCK // 3), dtype=np.uint8)
+        for start in range(0, count, len(pattern)):
+            size = min(len(pattern), count - start)
+            out[first + start * stride:first + (start + size - 1) * stride + 1:stride] = pattern[:size]
+
+# Classic 3-peg Tower of Hanoi iterative solution, filled in place by fill_hanoi_iterative
+def solve_hanoi_iterative(n, source, auxiliary, destination, packed=False):
+    start_time = time.time()
+    
+    moves = bytearray((1 << n) - 1)
+    fill_hanoi_iterative(moves, n, source, auxiliary, destination)
+    
+    end_time = time.time()
+    return (moves if packed else unpack_moves(moves)), end_time - start_time
+
+# Classic 3-peg Tower of Hanoi solution computed with NumPy, for bulk use
+# Move i goes from canonical peg (i & (i-1)) % 3 to ((i | (i-1)) + 1) % 3, which solves towards
+# canonical peg 2 for odd n and peg 1 for even n; one lookup then relabels to the requested pegs.
+# Returns ((sources, destinations), elapsed) as uint8 arrays of peg indices;
+# pass packed=True for the one-byte-per-move encoding from moves.py instead.
+def solve_hanoi_vectorized(n, source, auxiliary, destination, packed=False):
+    start_time = time.time()
+    
+    if n % 2:
+        labels = np.array([PEG_INDEX[source], PEG_INDEX[auxiliary], PEG_INDEX[destination]], dtype=np.uint8)
+    else:
+        labels = np.array([PEG_INDEX[source], PEG_INDEX[destination], PEG_INDEX[auxiliary]], dtype=np.uint8)
+    
+    i = np.arange(1, 1 << n, dtype=np.int64)
+    sources = labels[(i & (i - 1)) % 3]
+    destinations = labels[((i | (i - 1)) + 1) % 3]
+    
+    if packed:
+        result = bytearray((sources << 4 | destinations).tobytes())
+    else:
+        result = (sources, destinations)
+    
+    end_time = time.time()
+    return result, end_time - start_time
+
+# Frame-Stewart algorithm for 4 pegs
+def solve_frame_stewart(n, source, aux1, aux2, destination, packed=False):
+    return _materialize(iter_frame_stewart(n, source, aux1, aux2, destination), packed)
+
+# Frame-Stewart algorithm for any number of pegs
+def solve_frame_stewart_pegs(n, pegs, packed=False):
+    return _materialize(iter_frame_stewart_pegs(n, pegs), packed)
+
+# Position oracle for the classic 3-peg solution.
+# Move k of the optimal solution is found by descending the recursion one disk at a time:
+# the first 2^(n-1) - 1 moves shift n-1 disks onto the auxiliary peg, move 2^(n-1) moves disk n,
+# and the rest shift the n-1 disks on top of it. Both lookups are O(n) and need no stored solution.
+
+# The k-th move (1-based) of the optimal solution, packed (see moves.py)
+def hanoi_move_at(n, k, source='A', auxiliary='B', destination='C'):
+    if not 1 <= k < 1 << n:
+        raise ValueError(f"Move {k} is out of range for {n} disks")
+    
+    source, auxiliary, destination = PEG_INDEX[source], PEG_INDEX[auxiliary], PEG_INDEX[destination]
+    while True:
+        half = 1 << (n - 1)
+        if k == half:
+            return source << 4 | destination
+        if k < half:
+            auxiliary, destination = destination, auxiliary
+        else:
+            k -= half
+            source, auxiliary = auxiliary, source
+        n -= 1
+
+# The board after the first k moves of the optimal solution, in the init_game_state layout
+def hanoi_state_after(n, k, source='A', auxiliary='B', destination='C'):
+    if not 0 <= k < 1 << n:
+        raise ValueError(f"Step {k} is out of range for {n} disks")
+    
+    state = {'A': [], 'B': [], 'C': [], 'D': []}
+    for disk in range(n, 0, -1):
+        half = 1 << (disk - 1)
+        if k < half:
+            # Disk has not moved yet; the disks above it are heading for the auxiliary peg
+            state[source].append(disk)
+            auxiliary, destination = destination, auxiliary
+        else:
+            # Disk is already on the destination; the disks above it are coming from the auxiliary peg
+            state[destination].append(disk)
+            k -= half
+            source, auxiliary = auxiliary, source
+    return state
@@ -1,61 +1,128 @@
 import streamlit as st
+import math
 import time
 import random
+import uuid
 import pandas as pd
 
 # Import from local modules
-from database import init_firestore, save_user_game, get_user_leaderboard
-from algorithms import solve_hanoi_recursive, solve_hanoi_iterative, solve_frame_stewart
-from game_logic import init_game_state, is_valid_move, apply_move, is_solved
-from ui_components import render_game_board
+from database import init_storage, save_user_game, save_algorithm_performance, get_user_leaderboard, queue_depth
+from database import save_move_sequence, get_algorithm_benchmarks, get_algorithm_summary
+from algorithms import hanoi_move_at, hanoi_state_after, frame_stewart_move_count
+from benchmark import MATERIALIZED_MAX_DISKS, offered_algorithms, default_algorithms, estimate_seconds
+from benchmark import analytic_move_counts, run_benchmarks
+from moves import decode_move, encode_move
+from validation import validate_move_sequence
+from solution_cache import solution_cache
+from corpus import open_corpus
+from jobs import job_runner, JobLimitError, DONE, FAILED, CANCELLED
+from game_logic import init_game_state, is_valid_move, apply_move, is_solved, goal_peg
+from ui_components import render_game_board, render_replay, render_move_log
 
 st.set_page_config(page_title="Tower of Hanoi Game", layout="wide")
 
+# Warm the shared solution cache once per server process
+@st.cache_resource
+def init_solution_cache():
+    solution_cache.warm_in_background()
+    return solution_cache
+
+# Open the precomputed solution corpus once per server process (None if it has not been generated)
+@st.cache_resource
+def init_corpus():
+    return open_corpus()
+
 # Helper function to check if game is solved and handle winning state
 def check_game_solved():
     if is_solved(st.session_state.game_state, st.session_state.disk_count):
         st.balloons()
         st.success(f"Congratulations! You solved the puzzle in {st.session_state.move_count} moves!")
         
-        # Get player name from session state
-        player_name = st.session_state.get("player_name", "Player")
-        
         # Compare with algorithms
-        compare_algorithms(player_name, st.session_state.disk_count, 
-                         st.session_state.move_count, ",".join(st.session_state.moves_made))
+        show_comparison(complete_game())
         
         # Reset game
         st.session_state.game_active = False
         return True
     return False
 
+# Helper function to run the end-of-game pipeline exactly once per game.
+# Reruns reuse the results kept in session state instead of solving and saving again.
+def complete_game():
+    game_id = st.session_state.game_id
+    if st.session_state.completed_game_id != game_id:
+        st.session_state.completion_results = compare_algorithms(
+            game_id, st.session_state.player_name, st.session_state.disk_count, 
+            st.session_state.move_count, st.session_state.moves_made)
+        st.session_state.completed_game_id = game_id
+    return st.session_state.completion_results
+
+# Helper function to display the algorithm comparison for a finished game
+def show_comparison(results):
+    for result in results:
+        timing = " (timed when first solved)" if result.get("cached") else ""
+        st.write(f"{result['label']} solved it in {result['moves_count']} moves in {result['execution_time']:.6f} seconds{timing}")
+
 # Helper function to compare algorithms and save results
-def compare_algorithms(player_name, disk_count, moves_count, move_sequence):
-    # Compare with algorithms
-    recursive_moves, recursive_time = solve_hanoi_recursive(disk_count, 'A', 'B', 'C')
-    iterative_moves, iterative_time = solve_hanoi_iterative(disk_count, 'A', 'B', 'C')
+# Records are saved under ids derived from the game id, so saving a game twice never duplicates them
+# Move sequences are stored compressed and content-addressed, so the optimal ones are written only once
+def compare_algorithms(game_id, player_name, disk_count, moves_count, player_moves):
+    peg_count = st.session_state.peg_count
     
-    st.write(f"Recursive algorithm solved it in {len(recursive_moves)} moves in {recursive_time:.6f} seconds")
-    st.write(f"Iterative algorithm solved it in {len(iterative_moves)} moves in {iterative_time:.6f} seconds")
-    
-    # Save results for 3 pegs
-    save_result(player_name, disk_count, moves_count, move_sequence, 
-               "Player Solution (3 pegs)", 0)
-    save_result("Algorithm", disk_count, len(recursive_moves), 
-               ",".join(recursive_moves), "Recursive", recursive_time)
-    save_result("Algorithm", disk_count, len(iterative_moves), 
-               ",".join(iterative_moves), "Iterative", iterative_time)
+    # Save the player's solution
+    save_user_game(player_name, disk_count, moves_count, pegs=peg_count, doc_id=f"{game_id}-player", 
+                   move_sequence_id=save_move_sequence(player_moves))
     
+    # Compare with algorithms. Solutions come from the shared cache; a cached time is from the original
+    # solve, so only fresh solves are recorded as benchmark results
+    # 3 pegs
+    algorithms = [("Recursive", "Recursive algorithm", "recursive", "ABC"), 
+                  ("Iterative", "Iterative algorithm", "iterative", "ABC")]
     # If 4 pegs were used, also compare with Frame-Stewart
-    if st.session_state.peg_count == 4:
-        fs_moves, fs_time = solve_frame_stewart(disk_count, 'A', 'B', 'C', 'D')
-        st.write(f"Frame-Stewart algorithm (4 pegs) solved it in {len(fs_moves)} moves in {fs_time:.6f} seconds")
-        
-        # Save results for 4 pegs
-        save_result(player_name, disk_count, moves_count, move_sequence, 
-                   "Player Solution (4 pegs)", 0)
-        save_result("Algorithm", disk_count, len(fs_moves), 
-                   ",".join(fs_moves), "Frame-Stewart (4 pegs)", fs_time)
+    if peg_count == 4:
+        algorithms.append(("Frame-Stewart (4 pegs)", "Frame-Stewart algorithm (4 pegs)", "frame-stewart", "ABCD"))
+    
+    results = []
+    for name, label, key, pegs in algorithms:
+        moves, execution_time, cached = solution_cache.lookup(key, disk_count, pegs)
+        if not cached:
+            save_algorithm_performance(name, disk_count, execution_time, len(moves), 
+                                       parameters={"pegs": len(pegs), "game_id": game_id}, 
+                                       doc_id=f"{game_id}-{key}", move_sequence_id=save_move_sequence(moves))
+        results.append({"label": label, "moves_count": len(moves), "execution_time": execution_time, "cached": cached})
+    return results
+
+# Helper function to get the number of moves in the optimal solution
+def optimal_move_count(disk_count, peg_count):
+    if peg_count == 3:
+        return (1 << disk_count) - 1
+    return frame_stewart_move_count(disk_count, peg_count)
+
+# Helper function to get the optimal 4-peg solution, read from the corpus when it holds it
+def frame_stewart_solution(disk_count):
+    corpus = init_corpus()
+    if corpus is not None and (4, disk_count) in corpus:
+        return corpus.moves(disk_count, 4)
+    fs_moves, _ = solution_cache.get("frame-stewart", disk_count, "ABCD")
+    return fs_moves
+
+# Helper function to look up the k-th optimal move (1-based) without storing the solution
+def optimal_move_at(disk_count, peg_count, k):
+    if peg_count == 3:
+        return hanoi_move_at(disk_count, k, 'A', 'B', 'C')
+    corpus = init_corpus()
+    if corpus is not None and (4, disk_count) in corpus:
+        return corpus.move_at(disk_count, k, 4)
+    return frame_stewart_solution(disk_count)[k - 1]
+
+# Helper function to get the board after the first k optimal moves
+def optimal_state_after(disk_count, peg_count, k):
+    if peg_count == 3:
+        return hanoi_state_after(disk_count, k, 'A', 'B', 'C')
+    fs_moves = frame_stewart_solution(disk_count)
+    state = init_game_state(disk_count, packed=True)
+    state.apply_moves(fs_moves[:k])
+    return state
 
 # Function to handle individual move using callbacks
 def make_move_callback():
@@ -68,8 +135,7 @@ def make_move_callback():
     
     if apply_move(st.session_state.game_state, source, destination):
         st.session_state.move_count += 1
-        st.session_state.moves_made.append(f"{source}->{destination}")
-        st.session_state.move_sequence = ",".join(st.session_state.moves_made)
+        st.session_state.moves_made.append(encode_move(source, destination))
         st.session_state.move_error = None
         
         # Check if the game is solved
@@ -78,96 +144,99 @@ def make_move_callback():
     else:
         st.session_state.move_error = "Invalid move! Remember, you cannot place a larger disk on a smaller one."
 
-# Function to replay moves from a sequence
-def replay_move_sequence():
-    if not st.session_state.is_replaying:
+# Function to process sequence submission
+def submit_solution():
+    # Parse and check the whole sequence in one pass; the packed moves are reused for replay
+    # An uploaded file takes precedence over pasted text; either is read in chunks
+    uploaded = st.session_state.get("move_sequence_file")
+    if uploaded is not None:
+        uploaded.seek(0)
+    source = uploaded if uploaded is not None else st.session_state.solution_sequence
+    result = validate_move_sequence(source, st.session_state.disk_count, 
+                                    st.session_state.peg_count, goal_peg(st.session_state.peg_count))
+    if result.error:
+        st.session_state.solution_error = result.error
         return
     
-    # Get current index and total moves
-    current_idx = st.session_state.current_replay_index
-    total_moves = len(st.session_state.replay_moves)
-    
-    # If we've reached the end, stop replaying
-    if current_idx >= total_moves:
-        st.session_state.is_replaying = False
-        
-        # Check if puzzle is solved
-        if is_solved(st.session_state.game_state, st.session_state.disk_count):
-            # Keep success state but stop replaying
-            st.session_state.replay_complete = True
+    if len(result.moves) != st.session_state.move_count_input:
+        st.session_state.solution_error = f"You specified {st.session_state.move_count_input} moves but provided {len(result.moves)} moves!"
         return
     
-    # Apply the current move
-    move = st.session_state.replay_moves[current_idx]
-    try:
-        source, destination = move.split('->')
+    if result.solved:
+        # The sequence is already validated, so jump straight to the solved board;
+        # the browser animates the replay from the packed moves without further reruns
+        game_state = init_game_state(st.session_state.disk_count, packed=True, 
+                                     destination=goal_peg(st.session_state.peg_count))
+        game_state.apply_moves(result.moves)
+        st.session_state.game_state = game_state
+        st.session_state.move_count = len(result.moves)
+        st.session_state.moves_made = bytearray(result.moves)
         
-        if apply_move(st.session_state.game_state, source, destination):
-            # Update move count and moves made
-            st.session_state.moves_made.append(move)
-            st.session_state.move_count += 1
-            
-            # Move to next index
-            st.session_state.current_replay_index += 1
-            
-            # Enforce a rerun to process the next move
-            st.rerun()
-        else:
-            # If move is invalid, stop replaying
-            st.session_state.is_replaying = False
-            st.session_state.replay_error = f"Invalid move: {move}"
-    except Exception as e:
-        st.session_state.is_replaying = False
-        st.session_state.replay_error = f"Error processing move: {move} - {str(e)}"
+        # Store moves for replay
+        st.session_state.replay_moves = bytes(result.moves)
+        st.session_state.replay_complete = True
+    else:
+        st.session_state.solution_error = "Your solution does not solve the puzzle!"
 
-# Function to process sequence submission
-def submit_solution():
-    moves = st.session_state.solution_sequence.split(',')
-    if len(moves) != st.session_state.move_count_input:
-        st.session_state.solution_error = f"You specified {st.session_state.move_count_input} moves but provided {len(moves)} moves!"
-        return
+# Rough duration for display, e.g. "under a second", "40 s", "12 min", "2 h 5 min"
+def format_duration(seconds):
+    if seconds < 1:
+        return "under a second"
+    if seconds < 60:
+        return f"{seconds:.0f} s"
+    if seconds < 3600:
+        return f"{seconds / 60:.0f} min"
+    return f"{seconds // 3600:.0f} h {seconds % 3600 / 60:.0f} min"
+
+# Background job body for a comparison: benchmark the algorithms, reporting moves generated as progress
+def comparison_job(job, algorithms, disk_count, repetitions, warmup, measure_memory):
+    return run_benchmarks(algorithms, [disk_count], repetitions, warmup, measure_memory=measure_memory, progress=job.progress)
+
+# Poll a running comparison once a second without rerunning the whole page
+@st.fragment(run_every=1)
+def show_comparison_progress(job_id):
+    job = job_runner.get(job_id)
+    if job is None or not job.active:
+        # Finished: rerun the page so the results are shown and polling stops
+        st.rerun()
     
-    # Reset game state and apply moves to test validity
-    test_state = init_game_state(st.session_state.disk_count)
-    valid_solution = True
+    st.progress(job.fraction, text=f"{job.description}: {job.done:,} of {job.total:,} moves generated")
+    if st.button("Cancel", key="cancel_comparison_button", disabled=job.cancel_requested):
+        job_runner.cancel(job_id)
+        st.rerun()
+
+# Helper function to save benchmark rows to the history
+def record_benchmarks(job_id, rows):
+    for row in rows:
+        save_algorithm_performance(row['algorithm'], row['disk_count'], row['median_s'], row['moves_count'], 
+                                   parameters={key: row[key] for key in ('pegs', 'repetitions', 'p95_s', 'stddev_s', 'min_s', 'peak_memory_bytes')}, 
+                                   notes="benchmark harness", doc_id=f"{job_id}-{row['algorithm']}")
+
+# Helper function to display benchmark rows
+def show_benchmark_results(rows):
+    df = pd.DataFrame(rows).rename(columns={
+        'algorithm': 'Algorithm',
+        'moves_count': 'Move Count',
+        'median_s': 'Execution Time (s)',
+        'p95_s': 'p95 (s)',
+        'stddev_s': 'Std Dev (s)',
+        'peak_memory_bytes': 'Peak Memory (bytes)'
+    })
+    st.dataframe(df[['Algorithm', 'Move Count', 'Execution Time (s)', 'p95 (s)', 'Std Dev (s)', 'Peak Memory (bytes)']])
     
-    for move in moves:
-        if '->' not in move:
-            st.session_state.solution_error = f"Invalid move format: {move}. Use 'Source->Destination' format."
-            valid_solution = False
-            break
-        
-        source, destination = move.split('->')
-        if not apply_move(test_state, source, destination):
-            st.session_state.solution_error = f"Invalid move: {move}. Check your solution."
-            valid_solution = False
-            break
+    # Visualization
+    st.subheader("Move Count Comparison")
+    st.bar_chart(df.set_index('Algorithm')['Move Count'])
     
-    if valid_solution:
-        if is_solved(test_state, st.session_state.disk_count):
-            # Setup for replaying the moves
-            st.session_state.game_state = init_game_state(st.session_state.disk_count)
-            st.session_state.move_count = 0
-            st.session_state.moves_made = []
-            st.session_state.move_sequence = st.session_state.solution_sequence
-            
-            # Store moves for replay
-            st.session_state.replay_moves = moves
-            st.session_state.current_replay_index = 0
-            st.session_state.is_replaying = True
-            st.session_state.replay_complete = False
-            st.session_state.replay_error = None
-            
-            # Trigger the first move in the sequence
-            st.rerun()
-        else:
-            st.session_state.solution_error = "Your solution does not solve the puzzle!"
+    st.subheader("Execution Time Comparison (median)")
+    st.bar_chart(df.set_index('Algorithm')['Execution Time (s)'])
 
 # Main application
 def main():
     
     # Initialize database
-    init_firestore()
+    init_storage()
+    init_solution_cache()
     
     # App title
     st.title("Tower of Hanoi Game")
@@ -181,14 +250,13 @@ def main():
         st.session_state.game_state = {}
     if 'move_count' not in st.session_state:
         st.session_state.move_count = 0
+    # Moves are kept packed, one byte per move (see moves.py)
     if 'moves_made' not in st.session_state:
-        st.session_state.moves_made = []
-    if 'optimal_moves' not in st.session_state:
-        st.session_state.optimal_moves = []
+        st.session_state.moves_made = bytearray()
+    if 'optimal_move_count' not in st.session_state:
+        st.session_state.optimal_move_count = 0
     if 'peg_count' not in st.session_state:
         st.session_state.peg_count = 3
-    if 'move_sequence' not in st.session_state:
-        st.session_state.move_sequence = ""
     if 'source_peg' not in st.session_state:
         st.session_state.source_peg = 'A'
     if 'destination_peg' not in st.session_state:
@@ -200,21 +268,29 @@ def main():
     if 'player_name' not in st.session_state:
         st.session_state.player_name = "Player"
     
+    # Completion state: the comparison for a game is computed and saved once, keyed by its id
+    if 'game_id' not in st.session_state:
+        st.session_state.game_id = None
+    if 'completed_game_id' not in st.session_state:
+        st.session_state.completed_game_id = None
+    if 'completion_results' not in st.session_state:
+        st.session_state.completion_results = []
+    
+    # Background jobs: each session is a job owner and remembers its latest comparison job
+    if 'session_id' not in st.session_state:
+        st.session_state.session_id = uuid.uuid4().hex
+    if 'comparison_job_id' not in st.session_state:
+        st.session_state.comparison_job_id = None
+    if 'record_comparison' not in st.session_state:
+        st.session_state.record_comparison = False
+    if 'recorded_job_id' not in st.session_state:
+        st.session_state.recorded_job_id = None
+    
     # Replay-specific state variables
     if 'replay_moves' not in st.session_state:
-        st.session_state.replay_moves = []
-    if 'current_replay_index' not in st.session_state:
-        st.session_state.current_replay_index = 0
-    if 'is_replaying' not in st.session_state:
-        st.session_state.is_replaying = False
+        st.session_state.replay_moves = b""
     if 'replay_complete' not in st.session_state:
         st.session_state.replay_complete = False
-    if 'replay_error' not in st.session_state:
-        st.session_state.replay_error = None
-    
-    # Continue replay if in progress
-    if st.session_state.is_replaying:
-        replay_move_sequence()
     
     # Sidebar for game options
     st.sidebar.header("Game Options")
@@ -222,8 +298,13 @@ def main():
     # Menu options
     menu = st.sidebar.selectbox("Menu", ["Play Tower of Hanoi", "Leaderboard", "Algorithm Comparison"])
     
-    # Process drag and drop moves if not replaying
-    if not st.session_state.is_replaying and 'source' in st.query_params and 'destination' in st.query_params:
+    # Saves are written in the background; show how many are still pending
+    pending_saves = queue_depth()
+    if pending_saves:
+        st.sidebar.caption(f"Saving {pending_saves} result(s)...")
+    
+    # Process drag and drop moves
+    if 'source' in st.query_params and 'destination' in st.query_params:
         source = st.query_params['source'][0]
         destination = st.query_params['destination'][0]
         
@@ -233,13 +314,12 @@ def main():
             make_move_callback()
 
     # Handle game solved state that happened through drag and drop
-    if st.session_state.game_solved and st.session_state.game_active and not st.session_state.is_replaying:
+    if st.session_state.game_solved and st.session_state.game_active:
         st.balloons()
         st.success(f"Congratulations! You solved the puzzle in {st.session_state.move_count} moves!")
         
         # Compare with algorithms
-        compare_algorithms(st.session_state.player_name, st.session_state.disk_count, 
-                         st.session_state.move_count, st.session_state.move_sequence)
+        show_comparison(complete_game())
         
         # Reset game
         st.session_state.game_active = False
@@ -248,70 +328,59 @@ def main():
     if menu == "Play Tower of Hanoi":
         st.header("Play Tower of Hanoi")
         
-        # Game setup if not replaying
-        if not st.session_state.is_replaying:
-            col1, col2, col3 = st.columns(3)
-            
-            with col1:
-                player_name = st.text_input("Your Name", key="player_name")
-            
-            with col2:
-                peg_count = st.radio("Number of Pegs", [3, 4], key="peg_selection")
-            
-            with col3:
-                if st.button("Start New Game", key="start_game_1"):
-                    # Generate random disk count between 5 and 10
-                    disk_count = random.randint(5, 10)
-                    st.session_state.disk_count = disk_count
-                    st.session_state.peg_count = peg_count
-                    st.session_state.game_state = init_game_state(disk_count)
-                    st.session_state.game_active = True
-                    st.session_state.move_count = 0
-                    st.session_state.moves_made = []
-                    st.session_state.move_sequence = ""
-                    st.session_state.move_error = None
-                    st.session_state.game_solved = False
-                    st.session_state.is_replaying = False
-                    st.session_state.replay_complete = False
-                    st.session_state.solution_success = False
-                    
-                    # Calculate optimal moves
-                    if peg_count == 3:
-                        st.session_state.optimal_moves, _ = solve_hanoi_recursive(disk_count, 'A', 'B', 'C')
-                    else:
-                        st.session_state.optimal_moves, _ = solve_frame_stewart(disk_count, 'A', 'B', 'C', 'D')
-                    
-                    st.success(f"Started a new game with {disk_count} disks and {peg_count} pegs!")
+        # Game setup
+        col1, col2, col3 = st.columns(3)
+        
+        with col1:
+            player_name = st.text_input("Your Name", key="player_name")
+        
+        with col2:
+            peg_count = st.radio("Number of Pegs", [3, 4], key="peg_selection")
+        
+        with col3:
+            if st.button("Start New Game", key="start_game_1"):
+                # Generate random disk count between 5 and 10
+                disk_count = random.randint(5, 10)
+                st.session_state.game_id = uuid.uuid4().hex
+                st.session_state.disk_count = disk_count
+                st.session_state.peg_count = peg_count
+                st.session_state.game_state = init_game_state(disk_count, packed=True, destination=goal_peg(peg_count))
+                st.session_state.game_active = True
+                st.session_state.move_count = 0
+                st.session_state.moves_made = bytearray()
+                st.session_state.move_error = None
+                st.session_state.game_solved = False
+                st.session_state.replay_complete = False
+                st.session_state.solution_success = False
+                
+                # Only the optimal move count is kept; hints look moves up on demand
+                st.session_state.optimal_move_count = optimal_move_count(disk_count, peg_count)
+                
+                st.success(f"Started a new game with {disk_count} disks and {peg_count} pegs!")
         
         if st.session_state.game_active:
-            # Display replay status if replaying
-            if st.session_state.is_replaying:
-                progress = st.session_state.current_replay_index / len(st.session_state.replay_moves)
-                st.progress(progress)
-                st.write(f"Replaying moves: {st.session_state.current_replay_index} of {len(st.session_state.replay_moves)}")
-            
-            # Display replay errors if any
-            if st.session_state.replay_error:
-                st.error(st.session_state.replay_error)
-            
             # Display game info
-            st.write(f"Current game: {st.session_state.disk_count} disks with {st.session_state.peg_count} pegs")
-            st.write(f"Minimum moves required: {len(st.session_state.optimal_moves)}")
+            st.write(f"Current game: {st.session_state.disk_count} disks with {st.session_state.peg_count} pegs "
+                     f"(move the tower to peg {goal_peg(st.session_state.peg_count)})")
+            st.write(f"Minimum moves required: {st.session_state.optimal_move_count}")
             st.write(f"Moves made so far: {st.session_state.move_count}")
             
-            # Display the move sequence
+            # Display the move sequence a page at a time
             if st.session_state.moves_made:
-                st.write("Move sequence: " + ", ".join(st.session_state.moves_made))
+                render_move_log(st.session_state.moves_made)
             
-            # Display the game board with drag and drop enabled
-            render_game_board(st.session_state.game_state, st.session_state.disk_count, st.session_state.peg_count)
+            # Display the game board with drag and drop enabled, or the animated replay of a submitted solution
+            if st.session_state.replay_complete:
+                render_replay(st.session_state.disk_count, st.session_state.replay_moves, st.session_state.peg_count)
+            else:
+                render_game_board(st.session_state.game_state, st.session_state.disk_count, st.session_state.peg_count)
             
             # Display any move errors
             if st.session_state.move_error:
                 st.error(st.session_state.move_error)
             
-            # If not replaying, show the move controls
-            if not st.session_state.is_replaying:
+            # Show the move controls until a submitted solution finishes the game
+            if not st.session_state.replay_complete:
                 # Move input (as alternative to drag and drop)
                 st.subheader("Make a Move")
                 col1, col2, col3 = st.columns(3)
@@ -332,12 +401,12 @@ def main():
                 col1, col2 = st.columns(2)
                 
                 with col1:
-                    move_count = st.number_input("Number of Moves", min_value=1, value=len(st.session_state.optimal_moves), key="move_count_input_field")
+                    move_count = st.number_input("Number of Moves", min_value=1, value=st.session_state.optimal_move_count, key="move_count_input_field")
                 
                 with col2:
-                    # Use the generated sequence as a default if available
-                    default_sequence = st.session_state.move_sequence if st.session_state.move_sequence else ""
-                    move_sequence = st.text_input("Move Sequence (e.g., A->B,B->C,A->C)", value=default_sequence, key="move_sequence_input")
+                    move_sequence = st.text_area("Move Sequence (e.g., A->B,B->C,A->C)", key="move_sequence_input", height=100)
+                    st.file_uploader("Or upload a move sequence file", type=["txt", "csv"], key="move_sequence_file",
+                                     help="One move per line or separated by commas or semicolons, e.g. A->B or AB")
                 
                 # Add state variables for sequence submission
                 if 'solution_sequence' not in st.session_state:
@@ -366,20 +435,28 @@ def main():
                 
                 # Get a hint
                 if st.button("Get Hint", key="get_hint_button"):
-                    if st.session_state.move_count < len(st.session_state.optimal_moves):
-                        hint = st.session_state.optimal_moves[st.session_state.move_count]
-                        st.info(f"Hint: Try moving from {hint.split('->')[0]} to {hint.split('->')[1]}")
+                    if st.session_state.move_count < st.session_state.optimal_move_count:
+                        hint = optimal_move_at(st.session_state.disk_count, st.session_state.peg_count, 
+                                               st.session_state.move_count + 1)
+                        hint_source, hint_destination = decode_move(hint)
+                        st.info(f"Hint: Try moving from {hint_source} to {hint_destination}")
                     else:
                         st.info("You've already made more moves than the optimal solution!")
+                
+                # Scrub through the optimal solution
+                with st.expander("Explore Optimal Solution"):
+                    step = st.slider("Jump to step", min_value=0, max_value=st.session_state.optimal_move_count, 
+                                     value=0, key="optimal_step_slider")
+                    render_game_board(optimal_state_after(st.session_state.disk_count, st.session_state.peg_count, step), 
+                                      st.session_state.disk_count, st.session_state.peg_count)
             
             # If replay is complete, show success message
             if st.session_state.replay_complete:
                 st.balloons()
                 st.success(f"Your solution is correct! Completed in {st.session_state.move_count} moves.")
                 
-                # Compare with algorithms
-                compare_algorithms(st.session_state.player_name, st.session_state.disk_count, 
-                                 st.session_state.move_count, st.session_state.move_sequence)
+                # Compare with algorithms (computed and saved once; reruns show the stored results)
+                show_comparison(complete_game())
                 
                 # Add a button to start a new game
                 if st.button("Start New Game", key="start_game_2"):
@@ -389,7 +466,14 @@ def main():
     
     elif menu == "Leaderboard":
         st.header("Leaderboard")
-        leaderboard = get_leaderboard()
+        
+        col1, col2 = st.columns(2)
+        with col1:
+            leaderboard_pegs = st.radio("Number of Pegs", [3, 4], key="leaderboard_pegs")
+        with col2:
+            leaderboard_disks = st.selectbox("Number of Disks", list(range(5, 11)), key="leaderboard_disks")
+        
+        leaderboard = get_user_leaderboard(leaderboard_disks, leaderboard_pegs)
         st.dataframe(leaderboard)
     
     elif menu == "Algorithm Comparison":
@@ -398,34 +482,102 @@ def main():
         # Compare algorithms for different disk counts
         st.subheader("Comparison by Disk Count")
         
-        disk_count = st.slider("Number of Disks", min_value=3, max_value=20, value=10, key="disk_count_slider")
+        mode = st.radio("Mode", ["Timed runs", "Move counts only"], horizontal=True, key="comparison_mode")
         
-        if st.button("Run Comparison", key="run_comparison_button"):
-            st.write("Running comparison...")
-            
-            # 3 pegs
-            recursive_moves, recursive_time = solve_hanoi_recursive(disk_count, 'A', 'B', 'C')
-            iterative_moves, iterative_time = solve_hanoi_iterative(disk_count, 'A', 'B', 'C')
+        if mode == "Move counts only":
+            # Exact counts come from the closed form and the Frame-Stewart table, so no moves are generated
+            max_disks = st.slider("Number of Disks", min_value=1, max_value=64, value=64, key="count_disk_slider")
+            counts = analytic_move_counts(range(1, max_disks + 1), (3, 4, 5))
             
-            # 4 pegs
-            fs_moves, fs_time = solve_frame_stewart(disk_count, 'A', 'B', 'C', 'D')
-            
-            # Results
-            data = {
-                'Algorithm': ['Recursive (3 pegs)', 'Iterative (3 pegs)', 'Frame-Stewart (4 pegs)'],
-                'Move Count': [len(recursive_moves), len(iterative_moves), len(fs_moves)],
-                'Execution Time (s)': [recursive_time, iterative_time, fs_time]
-            }
+            # Counts outgrow 64-bit integers, so they are shown as text and charted as log2
+            st.dataframe(pd.DataFrame([{"Disks": row["disk_count"], **{f"{pegs} pegs": str(row[pegs]) for pegs in (3, 4, 5)}} 
+                                       for row in counts]), hide_index=True)
+            st.subheader("Minimal Move Count (log2)")
+            st.line_chart(pd.DataFrame([{f"{pegs} pegs": math.log2(row[pegs]) for pegs in (3, 4, 5)} for row in counts], 
+                                       index=[row["disk_count"] for row in counts]))
+        else:
+            disk_count = st.slider("Number of Disks", min_value=3, max_value=30, value=10, key="disk_count_slider")
+        
+            col1, col2 = st.columns(2)
+            with col1:
+                repetitions = st.number_input("Repetitions", min_value=1, max_value=50, value=5, key="benchmark_repetitions")
+            with col2:
+                warmup = st.number_input("Warmup runs", min_value=0, max_value=10, value=1, key="benchmark_warmup")
+            offered = offered_algorithms(disk_count)
+            if disk_count <= MATERIALIZED_MAX_DISKS:
+                algorithms = st.multiselect("Algorithms", offered, default=default_algorithms(disk_count), key="benchmark_algorithms")
+            else:
+                # Beyond this only streamed runs (moves counted, never stored) and parallel runs are offered
+                st.caption(f"Above {MATERIALIZED_MAX_DISKS} disks only streamed and parallel runs are available. "
+                           f"Each run generates {(1 << disk_count) - 1:,} moves for 3 pegs.")
+                algorithms = st.multiselect("Algorithms", offered, default=default_algorithms(disk_count), 
+                                            key="benchmark_streamed_algorithms")
+            measure_memory = st.checkbox("Measure peak memory (tracemalloc)", key="benchmark_memory")
+            record_results = st.checkbox("Record results to the benchmark history", key="benchmark_record")
+            if algorithms:
+                runs = warmup + repetitions + (1 if measure_memory else 0)
+                st.caption(f"Estimated run time: {format_duration(estimate_seconds(algorithms, disk_count, runs))}")
+        
+            # Comparisons run as background jobs; the page polls the job instead of blocking on it
+            job = job_runner.get(st.session_state.comparison_job_id) if st.session_state.comparison_job_id else None
+            if not algorithms:
+                st.caption("Select at least one algorithm to run a comparison.")
+            if st.button("Run Comparison", key="run_comparison_button", disabled=not algorithms or (job is not None and job.active)):
+                try:
+                    job = job_runner.submit(st.session_state.session_id, f"Comparing {len(algorithms)} algorithms on {disk_count} disks", 
+                                            comparison_job, algorithms, disk_count, repetitions, warmup, measure_memory)
+                    st.session_state.comparison_job_id = job.id
+                    st.session_state.record_comparison = record_results
+                except JobLimitError as e:
+                    st.warning(str(e))
             
-            df = pd.DataFrame(data)
-            st.dataframe(df)
+            if job is not None:
+                if job.active:
+                    show_comparison_progress(job.id)
+                elif job.status == DONE:
+                    # Results are recorded once per job, under ids derived from the job id
+                    if st.session_state.record_comparison and st.session_state.recorded_job_id != job.id:
+                        record_benchmarks(job.id, job.result)
+                        st.session_state.recorded_job_id = job.id
+                    show_benchmark_results(job.result)
+                elif job.status == FAILED:
+                    st.error(f"The comparison failed: {job.error}")
+                elif job.status == CANCELLED:
+                    st.info("The comparison was cancelled.")
+        
+        # Recorded history, charted from the pre-aggregated summaries rather than every record
+        st.subheader("Benchmark History")
+        summary = get_algorithm_summary()
+        if summary.empty:
+            st.info("No benchmark results recorded yet.")
+        else:
+            st.dataframe(summary)
+            st.line_chart(summary.pivot_table(index='disk_count', columns='algorithm', values='median'))
+        
+        with st.expander("All recorded results"):
+            # Page cursors: benchmark_page_cursors[i] is where page i starts
+            if 'benchmark_page_cursors' not in st.session_state:
+                st.session_state.benchmark_page_cursors = [None]
+            if 'benchmark_page' not in st.session_state:
+                st.session_state.benchmark_page = 0
             
-            # Visualization
-            st.subheader("Move Count Comparison")
-            st.bar_chart(df.set_index('Algorithm')['Move Count'])
+            page = st.session_state.benchmark_page
+            history, next_cursor = get_algorithm_benchmarks(page_size=50, start_after=st.session_state.benchmark_page_cursors[page])
+            st.dataframe(history)
             
-            st.subheader("Execution Time Comparison")
-            st.bar_chart(df.set_index('Algorithm')['Execution Time (s)'])
+            col1, col2, col3 = st.columns(3)
+            with col1:
+                if st.button("Previous page", key="benchmark_previous_page", disabled=page == 0):
+                    st.session_state.benchmark_page -= 1
+                    st.rerun()
+            with col2:
+                st.write(f"Page {page + 1}")
+            with col3:
+                if st.button("Next page", key="benchmark_next_page", disabled=next_cursor is None):
+                    del st.session_state.benchmark_page_cursors[page + 1:]
+                    st.session_state.benchmark_page_cursors.append(next_cursor)
+                    st.session_state.benchmark_page += 1
+                    st.rerun()
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,281 @@
+import argparse
+import csv
+import gc
+import json
+import math
+import statistics
+import threading
+import time
+import tracemalloc
+
+from algorithms import solve_hanoi_recursive, solve_hanoi_iterative, solve_hanoi_vectorized, solve_frame_stewart
+from algorithms import frame_stewart_move_count
+from algorithms import iter_hanoi_recursive, iter_hanoi_iterative, iter_frame_stewart
+from sinks import CountingSink, drain
+from parallel import solve_parallel_shared, MIN_PARALLEL_MOVES
+
+# Benchmark harness for the solvers in algorithms.py.
+# Each algorithm is timed with perf_counter_ns over several repetitions after warmup runs,
+# with the garbage collector paused while timing; peak memory is measured in a separate
+# tracemalloc run so tracing never inflates the timings.
+#
+# Headless use: python benchmark.py --disks 10 15 20 --repetitions 7 --csv results.csv
+
+# The garbage collector and tracemalloc are process-wide while comparisons run as concurrent jobs.
+# GC pauses are counted: the first timed run to start disables the collector and the last to finish
+# re-enables it (if it was enabled at import). Memory runs trace one at a time, and a run waiting
+# for the tracer keeps reporting, so it can still be cancelled.
+_gc_enabled = gc.isenabled()
+_gc_pauses = 0
+_gc_lock = threading.Lock()
+_trace_lock = threading.Lock()
+
+# Seconds between cancellation checks while waiting for the tracer
+TRACE_WAIT_INTERVAL = 0.25
+
+def _pause_gc():
+    global _gc_pauses
+    with _gc_lock:
+        _gc_pauses += 1
+        gc.disable()
+
+def _resume_gc():
+    global _gc_pauses
+    with _gc_lock:
+        _gc_pauses -= 1
+        if _gc_pauses == 0 and _gc_enabled:
+            gc.enable()
+
+# Solver runners: each solves n disks and returns the number of moves generated.
+# on_moves, if given, is called with moves generated so far in the run; only the streamed
+# runners report during a run (once per chunk), the others leave it to the caller.
+def _recursive(n, on_moves=None):
+    moves, _ = solve_hanoi_recursive(n, 'A', 'B', 'C', packed=True)
+    return len(moves)
+
+def _iterative(n, on_moves=None):
+    moves, _ = solve_hanoi_iterative(n, 'A', 'B', 'C', packed=True)
+    return len(moves)
+
+def _vectorized(n, on_moves=None):
+    (sources, _), _ = solve_hanoi_vectorized(n, 'A', 'B', 'C')
+    return len(sources)
+
+def _frame_stewart(n, on_moves=None):
+    moves, _ = solve_frame_stewart(n, 'A', 'B', 'C', 'D', packed=True)
+    return len(moves)
+
+# Streamed runners time generation alone: moves go to a counting sink and are never stored
+def _recursive_streamed(n, on_moves=None):
+    sink, _ = drain(iter_hanoi_recursive(n, 'A', 'B', 'C'), CountingSink(), on_chunk=on_moves)
+    return sink.count
+
+def _iterative_streamed(n, on_moves=None):
+    sink, _ = drain(iter_hanoi_iterative(n, 'A', 'B', 'C'), CountingSink(), on_chunk=on_moves)
+    return sink.count
+
+def _frame_stewart_streamed(n, on_moves=None):
+    sink, _ = drain(iter_frame_stewart(n, 'A', 'B', 'C', 'D'), CountingSink(), on_chunk=on_moves)
+    return sink.count
+
+# Parallel runners leave the moves in shared memory and free it once counted
+def _parallel_shared(n, pegs):
+    block, moves_count, _ = solve_parallel_shared(n, pegs)
+    block.close()
+    block.unlink()
+    return moves_count
+
+def _parallel(n, on_moves=None):
+    return _parallel_shared(n, "ABC")
+
+# Registered algorithms: name -> (peg count, runner)
+ALGORITHMS = {
+    "Recursive (3 pegs)": (3, _recursive),
+    "Iterative (3 pegs)": (3, _iterative),
+    "Vectorized (3 pegs)": (3, _vectorized),
+    "Frame-Stewart (4 pegs)": (4, _frame_stewart),
+    "Recursive, streamed (3 pegs)": (3, _recursive_streamed),
+    "Iterative, streamed (3 pegs)": (3, _iterative_streamed),
+    "Frame-Stewart, streamed (4 pegs)": (4, _frame_stewart_streamed),
+    "Parallel (3 pegs)": (3, _parallel),
+}
+
+# Streamed runners never hold the moves, so they stay usable far beyond the materialized ones
+STREAMED_ALGORITHMS = [name for name in ALGORITHMS if "streamed" in name]
+
+PARALLEL_ALGORITHMS = [name for name in ALGORITHMS if "parallel" in name.lower()]
+
+# Rough single-core throughput of each runner in moves per second, measured at 20 to 22 disks;
+# only used to estimate how long a comparison will take
+MOVES_PER_SECOND = {
+    "Recursive (3 pegs)": 7e6,
+    "Iterative (3 pegs)": 400e6,
+    "Vectorized (3 pegs)": 30e6,
+    "Frame-Stewart (4 pegs)": 1e6,
+    "Recursive, streamed (3 pegs)": 0.7e6,
+    "Iterative, streamed (3 pegs)": 4.5e6,
+    "Frame-Stewart, streamed (4 pegs)": 1e6,
+    "Parallel (3 pegs)": 12e6,
+}
+
+# Estimated seconds for runs runs of each algorithm at n disks
+def estimate_seconds(algorithms, n, runs):
+    return sum(runs * frame_stewart_move_count(n, ALGORITHMS[name][0]) / MOVES_PER_SECOND[name] for name in algorithms)
+
+# Largest disk count the materialized runners are offered for (2^20 moves is about 1 MiB packed)
+MATERIALIZED_MAX_DISKS = 20
+
+# Largest disk count the parallel runners are offered for; their moves are held in shared memory (64 MiB here)
+PARALLEL_MAX_DISKS = 26
+
+# Algorithms the comparison page offers for n disks. Parallel runners are only offered where they
+# actually split the work (below MIN_PARALLEL_MOVES they solve in-process), and the materialized
+# ones only up to MATERIALIZED_MAX_DISKS.
+def offered_algorithms(n):
+    parallel = [name for name in PARALLEL_ALGORITHMS
+                if n <= PARALLEL_MAX_DISKS and frame_stewart_move_count(n, ALGORITHMS[name][0]) >= MIN_PARALLEL_MOVES]
+    if n <= MATERIALIZED_MAX_DISKS:
+        return [name for name in ALGORITHMS if name not in PARALLEL_ALGORITHMS] + parallel
+    return STREAMED_ALGORITHMS + parallel
+
+# Algorithms selected by default for n disks. Above MATERIALIZED_MAX_DISKS the slow recursive
+# streamed runner has to be picked explicitly (about 20 minutes per run at 30 disks).
+def default_algorithms(n):
+    offered = offered_algorithms(n)
+    if n <= MATERIALIZED_MAX_DISKS:
+        return offered
+    return [name for name in offered if name != "Recursive, streamed (3 pegs)"]
+
+# Exact minimal move counts for each disk count and peg count, as Python ints:
+# 2^n - 1 for 3 pegs and the Frame-Stewart value for more. Nothing is generated.
+def analytic_move_counts(disk_counts, peg_counts=(3, 4)):
+    return [{"disk_count": n, **{pegs: frame_stewart_move_count(n, pegs) for pegs in peg_counts}} for n in disk_counts]
+
+# Nearest-rank percentile of a list of samples
+def percentile(samples, fraction):
+    ordered = sorted(samples)
+    return ordered[max(0, math.ceil(fraction * len(ordered)) - 1)]
+
+# Time one algorithm at one disk count and summarize the samples.
+# on_moves, if given, is called with the number of newly generated moves as runs progress
+# (once per chunk in streamed runs, else after each run; warmup and memory runs included).
+# It may raise to abandon the benchmark, e.g. when a job is cancelled.
+def benchmark_algorithm(name, n, repetitions=5, warmup=1, disable_gc=True, measure_memory=False, on_moves=None):
+    pegs, runner = ALGORITHMS[name]
+    on_moves = on_moves or (lambda count: None)
+    reported = 0
+
+    def report(count):
+        nonlocal reported
+        reported += count
+        on_moves(count)
+
+    # Report whatever part of a finished run the runner did not report itself
+    def finish_run(moves_count):
+        nonlocal reported
+        on_moves(moves_count - reported)
+        reported = 0
+
+    for _ in range(warmup):
+        finish_run(runner(n, report))
+
+    samples = []
+    moves_count = 0
+    for _ in range(repetitions):
+        gc.collect()
+        if disable_gc:
+            _pause_gc()
+        try:
+            start = time.perf_counter_ns()
+            moves_count = runner(n, report)
+            elapsed = time.perf_counter_ns() - start
+        finally:
+            if disable_gc:
+                _resume_gc()
+        samples.append(elapsed / 1e9)
+        finish_run(moves_count)
+
+    peak_memory = None
+    if measure_memory:
+        while not _trace_lock.acquire(timeout=TRACE_WAIT_INTERVAL):
+            on_moves(0)
+        try:
+            gc.collect()
+            tracemalloc.start()
+            try:
+                moves_count = runner(n, report)
+                _, peak_memory = tracemalloc.get_traced_memory()
+            finally:
+                tracemalloc.stop()
+        finally:
+            _trace_lock.release()
+        finish_run(moves_count)
+
+    return {
+        "algorithm": name,
+        "disk_count": n,
+        "pegs": pegs,
+        "moves_count": moves_count,
+        "repetitions": repetitions,
+        "median_s": statistics.median(samples),
+        "p95_s": percentile(samples, 0.95),
+        "stddev_s": statistics.stdev(samples) if len(samples) > 1 else 0.0,
+        "min_s": min(samples),
+        "peak_memory_bytes": peak_memory,
+    }
+
+# Benchmark every (algorithm, disk count) pair; returns one summary row per pair.
+# algorithms=None runs every registered algorithm; an empty list runs none.
+# progress, if given, is called as progress(moves generated, total moves) before the first run
+# and then as moves are generated (see benchmark_algorithm), and may raise to stop the benchmarks.
+def run_benchmarks(algorithms=None, disk_counts=(10,), repetitions=5, warmup=1, disable_gc=True, measure_memory=False, progress=None):
+    algorithms = list(ALGORITHMS) if algorithms is None else list(algorithms)
+    pairs = [(name, n) for n in disk_counts for name in algorithms]
+    runs = warmup + repetitions + (1 if measure_memory else 0)
+    total = sum(runs * frame_stewart_move_count(n, ALGORITHMS[name][0]) for name, n in pairs)
+    done = 0
+
+    def on_moves(count):
+        nonlocal done
+        done += count
+        if progress:
+            progress(done, total)
+
+    if progress:
+        progress(done, total)
+    return [benchmark_algorithm(name, n, repetitions, warmup, disable_gc, measure_memory, on_moves) for name, n in pairs]
+
+def write_csv(rows, path):
+    with open(path, "w", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=list(rows[0]))
+        writer.writeheader()
+        writer.writerows(rows)
+
+def write_json(rows, path):
+    with open(path, "w") as f:
+        json.dump(rows, f, indent=2)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the Tower of Hanoi solvers.")
+    parser.add_argument("--disks", type=int, nargs="+", default=[10, 15, 20], help="disk counts to benchmark")
+    parser.add_argument("--algorithms", nargs="+", choices=list(ALGORITHMS), default=None, help="algorithms to run (default: all)")
+    parser.add_argument("--repetitions", type=int, default=5)
+    parser.add_argument("--warmup", type=int, default=1)
+    parser.add_argument("--keep-gc", action="store_true", help="leave the garbage collector enabled while timing")
+    parser.add_argument("--memory", action="store_true", help="measure peak memory with tracemalloc")
+    parser.add_argument("--csv", help="write results to this CSV file")
+    parser.add_argument("--json", help="write results to this JSON file")
+    args = parser.parse_args(argv)
+
+    rows = run_benchmarks(args.algorithms, args.disks, args.repetitions, args.warmup, not args.keep_gc, args.memory)
+
+    if args.csv:
+        write_csv(rows, args.csv)
+    if args.json:
+        write_json(rows, args.json)
+    for row in rows:
+        print(f"{row['algorithm']:<34} n={row['disk_count']:<3} moves={row['moves_count']:<10} "
+              f"median={row['median_s']:.6f}s p95={row['p95_s']:.6f}s stddev={row['stddev_s']:.6f}s")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,150 @@
+import argparse
+import mmap
+import os
+import struct
+
+import numpy as np
+
+from algorithms import solve_hanoi_iterative, solve_frame_stewart_pegs, hanoi_state_after
+
+# Binary corpus of precomputed optimal solutions, read through mmap so a whole solution or a
+# single move can be looked up without loading the file.
+#
+# Solutions use the canonical pegs: A -> C via B for 3 pegs, A -> D via B, C for 4 pegs.
+# Moves are bit-packed, the first move in the lowest bits of the first byte:
+#   4 pegs: 4 bits per move, source << 2 | destination (peg indices)
+#   3 pegs: 2 bits per move, the index of the peg the move does not touch. The direction is
+#           implied, since between two pegs only the smaller top disk can move.
+#
+# Layout: header (magic, version, entry count), then one index entry per solution
+# (pegs, n, bits per move, moves count, byte offset of its data), then the data.
+#
+# Regenerate with: python corpus.py --disks 1 16
+
+CORPUS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "hanoi_corpus.bin")
+
+MAGIC = b"HNOI"
+VERSION = 1
+HEADER = struct.Struct("<4sHH")
+ENTRY = struct.Struct("<BBBxQQ")
+
+BITS_PER_MOVE = {3: 2, 4: 4}
+
+# Encode packed moves (see moves.py) as corpus move codes
+def _encode(moves, pegs):
+    moves = np.frombuffer(bytes(moves), dtype=np.uint8)
+    sources, destinations = moves >> 4, moves & 0x0F
+    if pegs == 3:
+        return (3 - sources - destinations).astype(np.uint8)
+    return (sources << 2 | destinations).astype(np.uint8)
+
+# Pack move codes into bytes, 8 // bits codes per byte
+def _pack_codes(codes, bits):
+    per_byte = 8 // bits
+    padded = np.zeros(-(-len(codes) // per_byte) * per_byte, dtype=np.uint8)
+    padded[:len(codes)] = codes
+    shifts = np.arange(per_byte, dtype=np.uint8) * bits
+    return (padded.reshape(-1, per_byte) << shifts).sum(axis=1, dtype=np.uint8).tobytes()
+
+# Write a corpus with the optimal solutions for every (pegs, n) given
+def build_corpus(path=CORPUS_PATH, disk_counts=range(1, 17), peg_counts=(3, 4)):
+    solutions = []
+    for pegs in peg_counts:
+        for n in disk_counts:
+            if pegs == 3:
+                moves, _ = solve_hanoi_iterative(n, 'A', 'B', 'C', packed=True)
+            else:
+                moves, _ = solve_frame_stewart_pegs(n, list("ABCD"), packed=True)
+            bits = BITS_PER_MOVE[pegs]
+            solutions.append((pegs, n, bits, len(moves), _pack_codes(_encode(moves, pegs), bits)))
+
+    offset = HEADER.size + ENTRY.size * len(solutions)
+    with open(path, "wb") as f:
+        f.write(HEADER.pack(MAGIC, VERSION, len(solutions)))
+        for pegs, n, bits, count, data in solutions:
+            f.write(ENTRY.pack(pegs, n, bits, count, offset))
+            offset += len(data)
+        for *_, data in solutions:
+            f.write(data)
+
+class SolutionCorpus:
+    def __init__(self, path=CORPUS_PATH):
+        with open(path, "rb") as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, count = HEADER.unpack_from(self._map, 0)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"{path} is not a version {VERSION} solution corpus")
+        # (pegs, n) -> (bits per move, moves count, offset)
+        self.index = {}
+        for i in range(count):
+            pegs, n, bits, moves_count, offset = ENTRY.unpack_from(self._map, HEADER.size + i * ENTRY.size)
+            self.index[(pegs, n)] = (bits, moves_count, offset)
+
+    def __contains__(self, key):
+        return key in self.index
+
+    def move_count(self, n, pegs=3):
+        return self.index[(pegs, n)][1]
+
+    # The k-th move (1-based) of the stored solution, packed (see moves.py)
+    def move_at(self, n, k, pegs=3):
+        bits, moves_count, offset = self.index[(pegs, n)]
+        if not 1 <= k <= moves_count:
+            raise ValueError(f"Move {k} is out of range for {n} disks")
+        per_byte = 8 // bits
+        code = self._map[offset + (k - 1) // per_byte] >> ((k - 1) % per_byte * bits) & ((1 << bits) - 1)
+        if pegs != 3:
+            return (code >> 2) << 4 | code & 3
+
+        # Recover the direction from the board before this move: the smaller top disk moves
+        first, second = [peg for peg in range(3) if peg != code]
+        state = hanoi_state_after(n, k - 1, 'A', 'B', 'C')
+        first_top, second_top = (state["ABC"[peg]][-1] if state["ABC"[peg]] else n + 1 for peg in (first, second))
+        return first << 4 | second if first_top < second_top else second << 4 | first
+
+    # The whole stored solution as packed moves
+    def moves(self, n, pegs=3):
+        bits, moves_count, offset = self.index[(pegs, n)]
+        per_byte = 8 // bits
+        data = np.frombuffer(self._map, dtype=np.uint8, count=-(-moves_count // per_byte), offset=offset)
+        shifts = np.arange(per_byte, dtype=np.uint8) * bits
+        codes = ((data[:, None] >> shifts) & ((1 << bits) - 1)).reshape(-1)[:moves_count]
+        if pegs != 3:
+            return bytearray(((codes >> 2) << 4 | codes & 3).tobytes())
+
+        # Replay the pairs on a board to recover each move's direction
+        towers = [list(range(n, 0, -1)), [], []]
+        moves = bytearray(moves_count)
+        for i, code in enumerate(codes.tolist()):
+            first, second = (1, 2) if code == 0 else (0, 2) if code == 1 else (0, 1)
+            if not towers[second] or (towers[first] and towers[first][-1] < towers[second][-1]):
+                source, destination = first, second
+            else:
+                source, destination = second, first
+            towers[destination].append(towers[source].pop())
+            moves[i] = source << 4 | destination
+        return moves
+
+    def close(self):
+        self._map.close()
+
+# Open the corpus, or return None when the file has not been generated
+def open_corpus(path=CORPUS_PATH):
+    if not os.path.exists(path):
+        return None
+    return SolutionCorpus(path)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate the binary solution corpus.")
+    parser.add_argument("--disks", type=int, nargs=2, default=[1, 16], metavar=("MIN", "MAX"), help="disk count range (inclusive)")
+    parser.add_argument("--output", default=CORPUS_PATH)
+    args = parser.parse_args(argv)
+
+    build_corpus(args.output, range(args.disks[0], args.disks[1] + 1))
+    corpus = SolutionCorpus(args.output)
+    total = sum(moves_count for _, moves_count, _ in corpus.index.values())
+    print(f"Wrote {len(corpus.index)} solutions ({total} moves) to {args.output} ({os.path.getsize(args.output)} bytes)")
+    corpus.close()
+
+if __name__ == "__main__":
+    main()
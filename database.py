@@ -1,35 +1,90 @@
-import firebase_admin
-from firebase_admin import credentials, firestore
 import streamlit as st
 import pandas as pd
+import hashlib
+import os
+import uuid
+import zlib
 from datetime import datetime
 
-# Initialize Firebase
+from storage import LEADERBOARD_SIZE, LEADERBOARD_FIELDS, BENCHMARK_FIELDS, SUMMARY_FIELDS, CHUNK_MOVES
+
+# Storage backend setting: the HANOI_STORAGE environment variable, else [storage] backend in
+# .streamlit/secrets.toml, else Firestore. "sqlite" stores everything in a local file
+# (HANOI_SQLITE_PATH or [storage] sqlite_path, default hanoi.db) and needs no credentials.
+def _storage_setting(name, env, default):
+    if os.environ.get(env):
+        return os.environ[env]
+    try:
+        return st.secrets["storage"][name]
+    except (KeyError, FileNotFoundError):
+        return default
+
+# One backend per server process, created on first use
 @st.cache_resource
-def init_firestore():
-     firebase_config = dict(st.secrets["firebase"])
-     cred = credentials.Certificate(firebase_config)
-    
-     if not firebase_admin._apps:
-        firebase_admin.initialize_app(cred)
-    
-     return firestore.client()
-
-db = init_firestore()
-
-def save_user_game(player_name, disk_count, moves_count, move_sequence):
-    doc_ref = db.collection("user_games").document()
-    doc_ref.set({
+def init_storage():
+    backend_name = _storage_setting("backend", "HANOI_STORAGE", "firestore").lower()
+    if backend_name == "sqlite":
+        from sqlite_backend import SQLiteBackend
+        backend = SQLiteBackend(_storage_setting("sqlite_path", "HANOI_SQLITE_PATH", "hanoi.db"))
+    elif backend_name == "firestore":
+        from firestore_backend import FirestoreBackend, init_firestore
+        backend = FirestoreBackend(init_firestore())
+    else:
+        raise ValueError(f"Unknown storage backend: {backend_name}")
+    backend.on_change = _clear_cached_reads
+    return backend
+
+def _clear_cached_reads():
+    get_user_leaderboard.clear()
+    get_algorithm_summary.clear()
+
+# Number of saves still waiting to be written
+def queue_depth():
+    return init_storage().queue_depth()
+
+# Move sequences are stored once per distinct sequence.
+# The id is the SHA-256 of the packed moves (see moves.py), so identical solutions share one copy.
+# The moves are split into chunks of CHUNK_MOVES, each zlib-compressed separately,
+# which keeps every Firestore document far below its 1 MiB limit.
+
+# Ids this process has seen written, so repeated sequences skip the write entirely.
+# An id is only added once the backend reports the sequence saved, so a dropped write is retried next time.
+_stored_sequences = set()
+
+# Store a packed move sequence and return its content id
+def save_move_sequence(moves):
+    moves = bytes(moves)
+    sequence_id = hashlib.sha256(moves).hexdigest()
+    if sequence_id in _stored_sequences:
+        return sequence_id
+
+    chunks = [zlib.compress(moves[start:start + CHUNK_MOVES]) for start in range(0, len(moves), CHUNK_MOVES)]
+    init_storage().save_move_sequence(sequence_id, len(moves), chunks, on_saved=lambda: _stored_sequences.add(sequence_id))
+    return sequence_id
+
+# Stream a stored move sequence back one decompressed chunk of packed moves at a time
+def load_move_sequence(sequence_id):
+    for chunk in init_storage().load_move_sequence(sequence_id):
+        yield zlib.decompress(chunk)
+
+# Passing a doc_id makes a save idempotent: saving the same record again overwrites it instead of adding a duplicate
+# Move sequences are passed either inline as text (move_sequence) or as a save_move_sequence id (move_sequence_id)
+def save_user_game(player_name, disk_count, moves_count, move_sequence=None, pegs=3, doc_id=None, move_sequence_id=None):
+    record = {
         "player_name": player_name,
         "disk_count": disk_count,
+        "pegs": pegs,
         "moves_count": moves_count,
-        "move_sequence": move_sequence,
         "timestamp": datetime.now()
-    })
+    }
+    if move_sequence is not None:
+        record["move_sequence"] = move_sequence
+    if move_sequence_id is not None:
+        record["move_sequence_id"] = move_sequence_id
+    init_storage().save_user_game(doc_id or uuid.uuid4().hex, record)
 
-def save_algorithm_performance(algorithm, disk_count, execution_time, moves_count, parameters=None, notes=None):
-    doc_ref = db.collection("algorithm_performance").document()
-    doc_ref.set({
+def save_algorithm_performance(algorithm, disk_count, execution_time, moves_count, parameters=None, notes=None, move_sequence=None, doc_id=None, move_sequence_id=None):
+    record = {
         "algorithm": algorithm,
         "disk_count": disk_count,
         "execution_time": execution_time,
@@ -37,27 +92,27 @@ def save_algorithm_performance(algorithm, disk_count, execution_time, moves_coun
         "timestamp": datetime.now(),
         "parameters": parameters,
         "notes": notes
-    })
-
-def get_user_leaderboard():
-    results = db.collection("user_games").order_by("moves_count").order_by("timestamp").limit(10).stream()
-    leaderboard = [{
-        "player_name": doc.to_dict()["player_name"],
-        "disk_count": doc.to_dict()["disk_count"],
-        "moves_count": doc.to_dict()["moves_count"],
-        "timestamp": doc.to_dict()["timestamp"]
-    } for doc in results]
-    return pd.DataFrame(leaderboard)
-
-def get_algorithm_benchmarks():
-    results = db.collection("algorithm_performance").order_by("disk_count").order_by("execution_time").stream()
-    benchmarks = [{
-        "algorithm": doc.to_dict()["algorithm"],
-        "disk_count": doc.to_dict()["disk_count"],
-        "execution_time": doc.to_dict()["execution_time"],
-        "moves_count": doc.to_dict()["moves_count"],
-        "timestamp": doc.to_dict()["timestamp"],
-        "parameters": doc.to_dict().get("parameters"),
-        "notes": doc.to_dict().get("notes")
-    } for doc in results]
-    return pd.DataFrame(benchmarks)
+    }
+    if move_sequence is not None:
+        record["move_sequence"] = move_sequence
+    if move_sequence_id is not None:
+        record["move_sequence_id"] = move_sequence_id
+    init_storage().save_algorithm_performance(doc_id or uuid.uuid4().hex, record)
+
+# Top games for one disk count and peg count, cached for all sessions until the TTL expires or a game is saved
+@st.cache_data(ttl=60)
+def get_user_leaderboard(disk_count, pegs=3, limit=LEADERBOARD_SIZE):
+    leaderboard = init_storage().get_user_leaderboard(disk_count, pegs, limit)
+    return pd.DataFrame(leaderboard, columns=LEADERBOARD_FIELDS)
+
+# One page of the benchmark history, ordered by disk count then execution time.
+# Returns (DataFrame, cursor); pass the cursor back as start_after for the next page (None when there is none).
+def get_algorithm_benchmarks(page_size=100, start_after=None):
+    benchmarks, cursor = init_storage().get_algorithm_benchmarks(page_size, start_after)
+    return pd.DataFrame(benchmarks, columns=BENCHMARK_FIELDS), cursor
+
+# All benchmark summaries, cached for all sessions until the TTL expires or a record is saved
+@st.cache_data(ttl=60)
+def get_algorithm_summary():
+    summary = init_storage().get_algorithm_summary()
+    return pd.DataFrame(summary, columns=SUMMARY_FIELDS).sort_values(["algorithm", "pegs", "disk_count"], ignore_index=True)
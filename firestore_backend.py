@@ -0,0 +1,302 @@
+import firebase_admin
+from firebase_admin import credentials, firestore
+from google.cloud.firestore_v1.base_query import FieldFilter
+import streamlit as st
+import atexit
+import logging
+import queue
+import threading
+import time
+from datetime import datetime
+
+from storage import StorageBackend, LEADERBOARD_SIZE, LEADERBOARD_FIELDS, BENCHMARK_FIELDS, SUMMARY_FIELDS
+from storage import merge_leaderboard, fold_summary, build_summaries, summary_key
+
+logger = logging.getLogger(__name__)
+
+# Initialize Firebase
+@st.cache_resource
+def init_firestore():
+     firebase_config = dict(st.secrets["firebase"])
+     cred = credentials.Certificate(firebase_config)
+
+     if not firebase_admin._apps:
+        firebase_admin.initialize_app(cred)
+
+     return firestore.client()
+
+# Write-behind queue: saves are queued and committed by a background thread in Firestore batch writes,
+# so the Streamlit script thread never waits on a database round trip.
+# A batch is committed once max_batch records are waiting or flush_interval seconds have passed;
+# failed commits are retried with exponential backoff, and the queue is drained at shutdown.
+# Tasks (plain callables) can be queued too; they run on the writer thread after the writes queued before them.
+# A write can carry an on_commit callback, called on the writer thread once its batch is committed
+# (never, if the batch is dropped after its retries).
+class WriteBehindQueue:
+    def __init__(self, client, max_batch=100, flush_interval=1.0, max_retries=5, backoff=0.5):
+        self.client = client
+        self.max_batch = min(max_batch, 500)  # Firestore allows at most 500 writes per batch
+        self.flush_interval = flush_interval
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.failed = 0
+        self._queue = queue.Queue()
+        # Document writes queued but not yet committed or dropped; tasks are not counted
+        self._pending_writes = 0
+        self._pending_lock = threading.Lock()
+        self._stopping = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="firestore-writer", daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    # Queue a document write
+    def put(self, doc_ref, record, on_commit=None):
+        with self._pending_lock:
+            self._pending_writes += 1
+        self._queue.put((doc_ref, record, on_commit))
+
+    # Queue a task to run once the writes queued before it are committed
+    def put_task(self, task):
+        self._queue.put((task, None, None))
+
+    # Number of queued document writes not yet committed
+    def depth(self):
+        return self._pending_writes
+
+    # Block until everything queued so far is committed (or given up on)
+    def flush(self):
+        self._queue.join()
+
+    # Drain the queue and stop the writer thread
+    def close(self):
+        if not self._stopping.is_set():
+            self._stopping.set()
+            self._thread.join()
+
+    def _run(self):
+        while not (self._stopping.is_set() and self._queue.empty()):
+            try:
+                first = self._queue.get(timeout=self.flush_interval)
+            except queue.Empty:
+                continue
+            items = [first]
+            deadline = time.monotonic() + self.flush_interval
+            while len(items) < self.max_batch and not self._stopping.is_set():
+                try:
+                    items.append(self._queue.get(timeout=max(0, deadline - time.monotonic())))
+                except queue.Empty:
+                    break
+            # On shutdown, take whatever is left without waiting
+            while len(items) < self.max_batch and self._stopping.is_set():
+                try:
+                    items.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            self._process(items)
+            for _ in items:
+                self._queue.task_done()
+
+    # Commit runs of writes as batches, running any tasks in queue order between them
+    def _process(self, items):
+        writes = []
+        for target, record, on_commit in items:
+            if record is not None:
+                writes.append((target, record, on_commit))
+                continue
+            if writes:
+                self._commit_writes(writes)
+                writes = []
+            self._retry(target, 1)
+        if writes:
+            self._commit_writes(writes)
+
+    def _commit_writes(self, writes):
+        committed = self._retry(lambda: self._commit(writes), len(writes))
+        with self._pending_lock:
+            self._pending_writes -= len(writes)
+        if committed:
+            for _, _, on_commit in writes:
+                if on_commit:
+                    on_commit()
+
+    def _commit(self, writes):
+        batch = self.client.batch()
+        for doc_ref, record, _ in writes:
+            batch.set(doc_ref, record)
+        batch.commit()
+
+    # Run an operation with retries; returns whether it eventually succeeded
+    def _retry(self, operation, count):
+        for attempt in range(self.max_retries + 1):
+            try:
+                operation()
+                return True
+            except Exception:
+                if attempt == self.max_retries:
+                    self.failed += count
+                    logger.exception("Dropping %d queued writes after %d retries", count, self.max_retries)
+                    return False
+                time.sleep(self.backoff * 2 ** attempt)
+
+# Firestore storage.
+# Writes go through the write-behind queue. Leaderboards are kept precomputed in
+# leaderboards/<pegs>-<disk_count> documents and benchmark summaries in algorithm_summaries,
+# both updated in transactions on the writer thread, so reading either costs a few document fetches.
+# Move sequences live in move_sequences/<id> with their chunks in a "chunks" subcollection.
+class FirestoreBackend(StorageBackend):
+    def __init__(self, client, write_queue=None):
+        self.db = client
+        self.write_queue = write_queue or WriteBehindQueue(client)
+
+    def save_user_game(self, record_id, record):
+        self.write_queue.put(self.db.collection("user_games").document(record_id), record)
+        self.write_queue.put_task(lambda: self._update_leaderboard(record_id, record))
+
+    def save_algorithm_performance(self, record_id, record):
+        self.write_queue.put(self.db.collection("algorithm_performance").document(record_id), record)
+        self.write_queue.put_task(lambda: self._update_algorithm_summary(record_id, record))
+
+    def save_move_sequence(self, sequence_id, moves_count, chunks, on_saved=None):
+        sequence_ref = self.db.collection("move_sequences").document(sequence_id)
+        header = {
+            "moves_count": moves_count,
+            "chunk_count": len(chunks),
+            "encoding": "packed+zlib",
+            "timestamp": datetime.now()
+        }
+        # The header is only queued once every chunk is committed, so a reader never sees it
+        # without its chunks; if a chunk is dropped, the sequence is simply not saved
+        pending = [len(chunks)]
+
+        def chunk_committed():
+            pending[0] -= 1
+            if pending[0] == 0:
+                self.write_queue.put(sequence_ref, header, on_saved)
+
+        for i, chunk in enumerate(chunks):
+            self.write_queue.put(sequence_ref.collection("chunks").document(str(i)), {"data": chunk}, chunk_committed)
+        if not chunks:
+            self.write_queue.put(sequence_ref, header, on_saved)
+
+    def load_move_sequence(self, sequence_id):
+        sequence_ref = self.db.collection("move_sequences").document(sequence_id)
+        header = sequence_ref.get()
+        if not header.exists:
+            return
+        for i in range(header.get("chunk_count")):
+            yield sequence_ref.collection("chunks").document(str(i)).get().get("data")
+
+    def _leaderboard_ref(self, disk_count, pegs):
+        return self.db.collection("leaderboards").document(f"{pegs}-{disk_count}")
+
+    # Merge a newly saved game into its precomputed leaderboard (runs on the writer thread)
+    def _update_leaderboard(self, game_id, record):
+        leaderboard_ref = self._leaderboard_ref(record["disk_count"], record["pegs"])
+
+        @firestore.transactional
+        def update(transaction):
+            snapshot = leaderboard_ref.get(transaction=transaction)
+            if snapshot.exists:
+                entries = snapshot.get("entries")
+            else:
+                # A new board starts from the games already saved for it
+                entries = self._top_games(record["disk_count"], record["pegs"], LEADERBOARD_SIZE, transaction)
+            transaction.set(leaderboard_ref, {"entries": merge_leaderboard(entries, game_id, record), "updated": datetime.now()})
+
+        update(self.db.transaction())
+        self._changed()
+
+    # Rebuild a precomputed leaderboard from the saved games (runs on the writer thread)
+    def _rebuild_leaderboard(self, disk_count, pegs):
+        leaderboard_ref = self._leaderboard_ref(disk_count, pegs)
+
+        @firestore.transactional
+        def rebuild(transaction):
+            entries = self._top_games(disk_count, pegs, LEADERBOARD_SIZE, transaction)
+            entries.sort(key=lambda e: (e["moves_count"], e["timestamp"].timestamp()))
+            transaction.set(leaderboard_ref, {"entries": entries, "updated": datetime.now()})
+
+        rebuild(self.db.transaction())
+        self._changed()
+
+    # Top saved games for one board as leaderboard entries, queried from user_games.
+    # Needs a composite index on user_games: disk_count, pegs, moves_count, timestamp (all ascending).
+    def _top_games(self, disk_count, pegs, limit, transaction=None):
+        query = (self.db.collection("user_games")
+                 .where(filter=FieldFilter("disk_count", "==", disk_count))
+                 .where(filter=FieldFilter("pegs", "==", pegs))
+                 .select(LEADERBOARD_FIELDS)
+                 .order_by("moves_count").order_by("timestamp")
+                 .limit(limit))
+        docs = transaction.get(query) if transaction is not None else query.stream()
+        return [dict(doc.to_dict(), game_id=doc.id) for doc in docs]
+
+    # Games saved before the peg count was recorded were all 3-peg games. Set pegs on them and
+    # rebuild their boards, so they rank again. Returns the number of games updated.
+    def backfill_leaderboards(self):
+        updated, disk_counts = 0, set()
+        for doc in self.db.collection("user_games").stream():
+            record = doc.to_dict()
+            if "pegs" not in record:
+                self.write_queue.put(doc.reference, dict(record, pegs=3))
+                updated += 1
+                disk_counts.add(record["disk_count"])
+        for disk_count in sorted(disk_counts):
+            self.write_queue.put_task(lambda disk_count=disk_count: self._rebuild_leaderboard(disk_count, 3))
+        self.write_queue.flush()
+        return updated
+
+    # Fold a newly saved benchmark record into its summary (runs on the writer thread)
+    def _update_algorithm_summary(self, record_id, record):
+        summary_ref = self.db.collection("algorithm_summaries").document(summary_key(record))
+
+        @firestore.transactional
+        def update(transaction):
+            snapshot = summary_ref.get(transaction=transaction)
+            summary = fold_summary(snapshot.to_dict() if snapshot.exists else None, record_id, record)
+            if summary is not None:
+                transaction.set(summary_ref, summary)
+
+        update(self.db.transaction())
+        self._changed()
+
+    # Run while no benchmarks are being saved: a record saved during the rebuild can be left out
+    def rebuild_algorithm_summaries(self):
+        self.write_queue.flush()
+        docs = list(self.db.collection("algorithm_performance").order_by("timestamp").stream())
+        summaries = build_summaries((doc.id, doc.to_dict()) for doc in docs)
+        for summary_id, summary in summaries.items():
+            self.write_queue.put(self.db.collection("algorithm_summaries").document(summary_id), summary)
+        self.write_queue.flush()
+        self._changed()
+        return len(docs)
+
+    def get_user_leaderboard(self, disk_count, pegs, limit):
+        snapshot = self._leaderboard_ref(disk_count, pegs).get()
+        if snapshot.exists and limit <= LEADERBOARD_SIZE:
+            return [{field: e[field] for field in LEADERBOARD_FIELDS} for e in snapshot.get("entries")[:limit]]
+
+        # No precomputed board yet: query only the fields shown, filtered to this board
+        return [{field: e[field] for field in LEADERBOARD_FIELDS} for e in self._top_games(disk_count, pegs, limit)]
+
+    # The cursor is the last document snapshot of the page
+    def get_algorithm_benchmarks(self, page_size, start_after):
+        query = (self.db.collection("algorithm_performance")
+                 .select(BENCHMARK_FIELDS)
+                 .order_by("disk_count").order_by("execution_time")
+                 .limit(page_size))
+        if start_after is not None:
+            query = query.start_after(start_after)
+        docs = list(query.stream())
+        benchmarks = [{field: doc.to_dict().get(field) for field in BENCHMARK_FIELDS} for doc in docs]
+        return benchmarks, docs[-1] if len(docs) == page_size else None
+
+    def get_algorithm_summary(self):
+        results = self.db.collection("algorithm_summaries").select(SUMMARY_FIELDS).stream()
+        return [doc.to_dict() for doc in results]
+
+    def queue_depth(self):
+        return self.write_queue.depth()
+
+    def flush(self):
+        self.write_queue.flush()
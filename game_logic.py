@@ -1,5 +1,97 @@
+from moves import PEG_NAMES, PEG_INDEX
+
+# Compact game state: one bitmask per peg, bit d-1 set when disk d (1 = smallest) is on that peg.
+# The top disk of a peg is the lowest set bit of its mask, so lookups and moves are O(1).
+# States hash and compare by their masks; apply_move mutates a state in place,
+# so take a copy() before using one as a dict key.
+# The solved flag is kept up to date by move(), so checking it is O(1).
+class PackedState:
+    __slots__ = ("n", "masks", "destination", "solved")
+
+    def __init__(self, n, pegs=4, masks=None, destination=2):
+        self.n = n
+        self.masks = list(masks) if masks is not None else [(1 << n) - 1] + [0] * (pegs - 1)
+        self.destination = destination
+        self.solved = self.masks[destination] == (1 << n) - 1
+
+    # Smallest disk on a peg (by index), or 0 when the peg is empty
+    def top(self, peg):
+        mask = self.masks[peg]
+        return (mask & -mask).bit_length()
+
+    # Peg index holding a disk
+    def peg_of(self, disk):
+        bit = 1 << (disk - 1)
+        for peg, mask in enumerate(self.masks):
+            if mask & bit:
+                return peg
+
+    def can_move(self, source, destination):
+        source_mask = self.masks[source]
+        destination_mask = self.masks[destination]
+        # The moved disk's bit must be lower than every bit on the destination peg
+        return source_mask != 0 and (destination_mask == 0 or (source_mask & -source_mask) < (destination_mask & -destination_mask))
+
+    def move(self, source, destination):
+        if not self.can_move(source, destination):
+            return False
+        bit = self.masks[source] & -self.masks[source]
+        self.masks[source] ^= bit
+        self.masks[destination] |= bit
+        # Only a move onto the goal peg can finish the puzzle, and only a move off it can undo that
+        if destination == self.destination:
+            self.solved = self.masks[destination] == (1 << self.n) - 1
+        elif source == self.destination:
+            self.solved = False
+        return True
+
+    # Apply a whole packed move sequence (see moves.py) in one tight loop over the masks.
+    # Stops at the first illegal move and returns its index, or None when every move was legal.
+    def apply_moves(self, moves):
+        masks = self.masks
+        error_index = None
+        for i, code in enumerate(moves):
+            source, destination = code >> 4, code & 0x0F
+            source_mask, destination_mask = masks[source], masks[destination]
+            bit = source_mask & -source_mask
+            # Covers empty sources, larger-on-smaller and source == destination
+            if not source_mask or (destination_mask and bit >= destination_mask & -destination_mask):
+                error_index = i
+                break
+            masks[source] = source_mask ^ bit
+            masks[destination] = destination_mask | bit
+        self.solved = masks[self.destination] == (1 << self.n) - 1
+        return error_index
+
+    def copy(self):
+        return PackedState(self.n, masks=self.masks, destination=self.destination)
+
+    @property
+    def key(self):
+        return tuple(self.masks)
+
+    def __hash__(self):
+        return hash(self.key)
+
+    def __eq__(self, other):
+        return isinstance(other, PackedState) and self.masks == other.masks
+
+    # Disks on a peg bottom to top, matching the dict-of-lists layout: state['A'] -> [5, 4, 3]
+    def __getitem__(self, peg):
+        mask = self.masks[PEG_INDEX[peg]]
+        return [disk for disk in range(self.n, 0, -1) if mask >> (disk - 1) & 1]
+
+    def __repr__(self):
+        return "PackedState(" + ", ".join(f"{PEG_NAMES[i]}={self[PEG_NAMES[i]]}" for i in range(len(self.masks))) + ")"
+
+# Goal peg for a game: 'C' with 3 pegs, and the last peg ('D') with 4, where Frame-Stewart finishes
+def goal_peg(pegs):
+    return PEG_NAMES[pegs - 1]
+
 # Initialize game state
-def init_game_state(n):
+def init_game_state(n, packed=False, destination='C'):
+    if packed:
+        return PackedState(n, destination=PEG_INDEX[destination])
     return {
         'A': list(range(n, 0, -1)),
         'B': [],
@@ -9,6 +101,8 @@ def init_game_state(n):
 
 # Validate a move
 def is_valid_move(state, source, destination):
+    if isinstance(state, PackedState):
+        return state.can_move(PEG_INDEX[source], PEG_INDEX[destination])
     if not state[source]:
         return False
     if not state[destination]:
@@ -17,6 +111,8 @@ def is_valid_move(state, source, destination):
 
 # Apply a move
 def apply_move(state, source, destination):
+    if isinstance(state, PackedState):
+        return state.move(PEG_INDEX[source], PEG_INDEX[destination])
     if is_valid_move(state, source, destination):
         disk = state[source].pop()
         state[destination].append(disk)
@@ -24,5 +120,12 @@ def apply_move(state, source, destination):
     return False
 
 # Check if the game is solved
-def is_solved(state, n, destination='C'):
-    return len(state[destination]) == n and sorted(state[destination], reverse=True) == state[destination]
\ No newline at end of file
+# Packed states default to the goal peg they were created with; dict states default to 'C'
+def is_solved(state, n, destination=None):
+    if isinstance(state, PackedState):
+        if destination is None or PEG_INDEX[destination] == state.destination:
+            return state.solved
+        # Disks on a peg are always in order, so a full mask means a finished tower
+        return state.masks[PEG_INDEX[destination]] == (1 << n) - 1
+    destination = destination or 'C'
+    return len(state[destination]) == n and sorted(state[destination], reverse=True) == state[destination]
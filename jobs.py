@@ -0,0 +1,123 @@
+import logging
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+# Background jobs for heavy work (benchmarks, large solves), shared by every session.
+# Jobs run on a small bounded pool so the Streamlit script thread never blocks on them;
+# pages keep the job id and poll it for progress and the result.
+# Each owner (a browser session) may only have a limited number of jobs queued or running,
+# so one user cannot saturate the server.
+
+QUEUED, RUNNING, DONE, FAILED, CANCELLED = "queued", "running", "done", "failed", "cancelled"
+
+# Raised inside a job when its cancellation has been requested
+class JobCancelled(Exception):
+    pass
+
+# Raised by submit when the owner or the server already has too many jobs
+class JobLimitError(Exception):
+    pass
+
+class Job:
+    def __init__(self, owner, description):
+        self.id = uuid.uuid4().hex
+        self.owner = owner
+        self.description = description
+        self.status = QUEUED
+        self.done = 0
+        self.total = 0
+        self.result = None
+        self.error = None
+        self.created = time.time()
+        self.finished = None
+        self._cancel = threading.Event()
+
+    @property
+    def active(self):
+        return self.status in (QUEUED, RUNNING)
+
+    # Fraction complete, for a progress bar
+    @property
+    def fraction(self):
+        return min(self.done / self.total, 1.0) if self.total else 0.0
+
+    # Called by the job function to report progress; raises JobCancelled once cancellation is requested
+    def progress(self, done, total):
+        self.done, self.total = done, total
+        if self._cancel.is_set():
+            raise JobCancelled()
+
+    def cancel(self):
+        self._cancel.set()
+
+    @property
+    def cancel_requested(self):
+        return self._cancel.is_set()
+
+class JobRunner:
+    def __init__(self, max_workers=2, max_active_per_owner=1, max_queued=8, keep_seconds=600):
+        self.max_active_per_owner = max_active_per_owner
+        self.max_queued = max_queued
+        self.keep_seconds = keep_seconds
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="job-runner")
+        self._jobs = {}
+        self._lock = threading.Lock()
+
+    # Queue fn(job, *args) as a job and return it. fn reports progress through job.progress(done, total)
+    # and its return value becomes job.result.
+    def submit(self, owner, description, fn, *args, **kwargs):
+        with self._lock:
+            self._prune()
+            active = [job for job in self._jobs.values() if job.active]
+            if sum(job.owner == owner for job in active) >= self.max_active_per_owner:
+                raise JobLimitError("You already have a job running. Wait for it to finish or cancel it.")
+            if len(active) >= self.max_queued:
+                raise JobLimitError("The server is busy. Try again shortly.")
+            job = Job(owner, description)
+            self._jobs[job.id] = job
+        self._executor.submit(self._run, job, fn, args, kwargs)
+        return job
+
+    def get(self, job_id):
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    # Request cancellation; a queued job never starts, a running one stops at its next progress report
+    def cancel(self, job_id):
+        job = self.get(job_id)
+        if job is not None:
+            job.cancel()
+        return job
+
+    def jobs_for(self, owner):
+        with self._lock:
+            return [job for job in self._jobs.values() if job.owner == owner]
+
+    def _run(self, job, fn, args, kwargs):
+        if job.cancel_requested:
+            job.status = CANCELLED
+        else:
+            job.status = RUNNING
+            try:
+                job.result = fn(job, *args, **kwargs)
+                job.status = DONE
+            except JobCancelled:
+                job.status = CANCELLED
+            except Exception as e:
+                logger.exception("Job %s failed", job.id)
+                job.error = str(e)
+                job.status = FAILED
+        job.finished = time.time()
+
+    # Forget finished jobs once nobody is likely to ask for them
+    def _prune(self):
+        cutoff = time.time() - self.keep_seconds
+        for job_id in [job.id for job in self._jobs.values() if job.finished and job.finished < cutoff]:
+            del self._jobs[job_id]
+
+# The shared runner for this process
+job_runner = JobRunner()
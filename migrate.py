@@ -0,0 +1,21 @@
+import argparse
+
+from database import init_storage
+
+# One-off migrations for records saved by older versions of the app, run against the configured
+# storage backend (see database.py). Safe to run more than once.
+#
+# Usage: python migrate.py
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Backfill leaderboards and benchmark summaries from records saved by older versions.")
+    parser.parse_args(argv)
+
+    backend = init_storage()
+    games = backend.backfill_leaderboards()
+    records = backend.rebuild_algorithm_summaries()
+    backend.flush()
+    print(f"Updated {games} games for the leaderboards and rebuilt the summaries from {records} benchmark records")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,39 @@
+# Peg names in index order; a peg's index is its position in this string
+PEG_NAMES = "ABCDEFGHIJKLMNOP"
+PEG_INDEX = {name: i for i, name in enumerate(PEG_NAMES)}
+
+# A move is packed into a single byte: high nibble = source peg, low nibble = destination peg.
+# Move sequences are stored as bytearray/bytes, so every move costs exactly one byte.
+def encode_move(source, destination):
+    return (PEG_INDEX[source] << 4) | PEG_INDEX[destination]
+
+# Decode a packed move back into (source, destination) peg names
+def decode_move(code):
+    return PEG_NAMES[code >> 4], PEG_NAMES[code & 0x0F]
+
+# Lookup table from packed move code to its legacy "A->C" string
+MOVE_STRINGS = [f"{PEG_NAMES[code >> 4]}->{PEG_NAMES[code & 0x0F]}" for code in range(256)]
+MOVE_CODES = {text: code for code, text in enumerate(MOVE_STRINGS)}
+
+# Lookup table from packed move code to its compact "AC" line, as written to downloads
+MOVE_LINES = [f"{PEG_NAMES[code >> 4]}{PEG_NAMES[code & 0x0F]}\n" for code in range(256)]
+
+# Convert a packed move to its legacy string form
+def move_to_str(code):
+    return MOVE_STRINGS[code]
+
+# Pack a list of legacy "A->C" strings
+def pack_moves(moves):
+    return bytearray(MOVE_CODES[move] for move in moves)
+
+# Unpack a packed move sequence into legacy "A->C" strings (UI edge only)
+def unpack_moves(packed):
+    return [MOVE_STRINGS[code] for code in packed]
+
+# Format a packed move sequence as the legacy comma separated string
+def format_moves(packed, separator=","):
+    return separator.join(MOVE_STRINGS[code] for code in packed)
+
+# Format a packed move sequence as one compact "AC" move per line; the validator reads this back
+def format_move_lines(packed):
+    return "".join(MOVE_LINES[code] for code in packed)
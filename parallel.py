@@ -0,0 +1,131 @@
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+from multiprocessing import shared_memory
+
+from algorithms import fill_hanoi_iterative, iter_frame_stewart_pegs, frame_stewart_table, frame_stewart_move_count
+from moves import PEG_NAMES, PEG_INDEX, unpack_moves
+
+# Parallel solution generation.
+# A solution splits into independent pieces at known offsets: the classic solution of n disks is
+# the n-1 disk solution onto the auxiliary peg, one move of the largest disk, and the n-1 disk
+# solution onto the destination (with relabelled pegs), and a Frame-Stewart solution is its three phases.
+# The split is applied until there are a few pieces per worker; each piece is solved by a worker
+# process, which writes its packed moves (see moves.py) straight into one shared memory block.
+
+# Below this many moves a single process is faster than handing out the pieces
+MIN_PARALLEL_MOVES = 1 << 20
+
+# Pieces per worker, so a slow worker does not hold up the rest
+PIECES_PER_WORKER = 4
+
+# Process pools by worker count, shared by every call and every thread. A pool is never shut down
+# while the process runs, so a call asking for another size cannot break a solve still using it.
+_executors = {}
+_executor_lock = threading.Lock()
+
+# Process pool with the given number of workers (default: one per CPU).
+# forkserver avoids forking a multi-threaded server process.
+def get_executor(workers=None):
+    workers = workers or os.cpu_count() or 1
+    with _executor_lock:
+        if workers not in _executors:
+            methods = multiprocessing.get_all_start_methods()
+            context = multiprocessing.get_context("forkserver" if "forkserver" in methods else "spawn")
+            _executors[workers] = ProcessPoolExecutor(max_workers=workers, mp_context=context)
+        return _executors[workers]
+
+# Split a solution into pieces. Pieces are (offset, n, pegs) with pegs as peg indices
+# [source, auxiliaries..., destination]; single moves between pieces are (offset, packed move).
+# The split follows iter_frame_stewart_pegs exactly, so the result matches the serial solvers.
+def _plan(n, pegs, offset, max_piece, pieces, single_moves):
+    if n == 0:
+        return
+    source, auxiliaries, destination = pegs[0], pegs[1:-1], pegs[-1]
+    if n == 1:
+        single_moves.append((offset, source << 4 | destination))
+        return
+    if frame_stewart_move_count(n, len(pegs)) <= max_piece:
+        pieces.append((offset, n, pegs))
+        return
+
+    if len(auxiliaries) == 1:
+        half = (1 << (n - 1)) - 1
+        _plan(n - 1, (source, destination, auxiliaries[0]), offset, max_piece, pieces, single_moves)
+        single_moves.append((offset + half, source << 4 | destination))
+        _plan(n - 1, (auxiliaries[0], source, destination), offset + half + 1, max_piece, pieces, single_moves)
+        return
+
+    k = frame_stewart_table(n, len(pegs))[n][1]
+    parking, others = auxiliaries[0], auxiliaries[1:]
+    parked = frame_stewart_move_count(k, len(pegs))
+    rest = frame_stewart_move_count(n - k, len(pegs) - 1)
+    _plan(k, (source,) + others + (destination, parking), offset, max_piece, pieces, single_moves)
+    _plan(n - k, (source,) + others + (destination,), offset + parked, max_piece, pieces, single_moves)
+    _plan(k, (parking, source) + others + (destination,), offset + parked + rest, max_piece, pieces, single_moves)
+
+# Worker: solve one piece straight into the shared block at its offset.
+# 3-peg pieces use the strided fill; others are streamed in chunks, so no private copy is built.
+def _solve_into(block_name, offset, n, pegs):
+    names = [PEG_NAMES[peg] for peg in pegs]
+    count = frame_stewart_move_count(n, len(pegs))
+    block = shared_memory.SharedMemory(name=block_name)
+    try:
+        with block.buf[offset:offset + count] as target:
+            if len(names) == 3:
+                fill_hanoi_iterative(target, n, *names)
+            else:
+                moves, position = iter_frame_stewart_pegs(n, names), 0
+                while chunk := bytes(islice(moves, 65536)):
+                    target[position:position + len(chunk)] = chunk
+                    position += len(chunk)
+    finally:
+        block.close()
+    return count
+
+# Solve into a new shared memory block; pegs lists the peg names as [source, auxiliaries..., destination].
+# Returns (block, moves_count, elapsed). The moves are block.buf[:moves_count]; the caller must
+# close() and unlink() the block when done.
+def solve_parallel_shared(n, pegs, workers=None):
+    start_time = time.time()
+
+    pegs = tuple(PEG_INDEX[peg] for peg in pegs)
+    total = frame_stewart_move_count(n, len(pegs))
+    block = shared_memory.SharedMemory(create=True, size=max(total, 1))
+    try:
+        if total < MIN_PARALLEL_MOVES:
+            _solve_into(block.name, 0, n, pegs)
+        else:
+            workers = workers or os.cpu_count() or 1
+            executor = get_executor(workers)
+            max_piece = max(1, total // (workers * PIECES_PER_WORKER))
+            pieces, single_moves = [], []
+            _plan(n, pegs, 0, max_piece, pieces, single_moves)
+            futures = [executor.submit(_solve_into, block.name, offset, m, piece_pegs) for offset, m, piece_pegs in pieces]
+            for offset, move in single_moves:
+                block.buf[offset] = move
+            for future in futures:
+                future.result()
+    except BaseException:
+        block.close()
+        block.unlink()
+        raise
+
+    end_time = time.time()
+    return block, total, end_time - start_time
+
+# Parallel solver with the same interface as the solvers in algorithms.py
+# (pass packed=True to keep the moves packed). The moves are copied out of shared memory;
+# use solve_parallel_shared to keep them there instead.
+def solve_parallel(n, pegs, workers=None, packed=False):
+    block, total, elapsed = solve_parallel_shared(n, pegs, workers)
+    try:
+        moves = bytearray(block.buf[:total])
+    finally:
+        block.close()
+        block.unlink()
+
+    return (moves if packed else unpack_moves(moves)), elapsed
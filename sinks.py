@@ -0,0 +1,104 @@
+import socket
+import time
+from itertools import islice
+
+from game_logic import PackedState
+from moves import PEG_INDEX
+
+# Move sinks consume a streamed solution (see the iter_* generators in algorithms.py).
+# Every sink takes chunks of packed moves through write(chunk) and is finished with close().
+
+# Counts moves without keeping them
+class CountingSink:
+    def __init__(self):
+        self.count = 0
+
+    def write(self, chunk):
+        self.count += len(chunk)
+
+    def close(self):
+        pass
+
+# Keeps every move in a single packed bytearray
+class CollectingSink:
+    def __init__(self):
+        self.moves = bytearray()
+
+    def write(self, chunk):
+        self.moves += chunk
+
+    def close(self):
+        pass
+
+# Replays moves on a fresh board, recording the first illegal move and whether the puzzle ends solved
+class ValidatingSink:
+    def __init__(self, n, destination='C'):
+        self.n = n
+        self.state = PackedState(n, destination=PEG_INDEX[destination])
+        self.count = 0
+        self.error_index = None
+        self.solved = False
+
+    def write(self, chunk):
+        if self.error_index is not None:
+            return
+        error_index = self.state.apply_moves(chunk)
+        if error_index is not None:
+            self.error_index = self.count + error_index
+            self.count += error_index
+            return
+        self.count += len(chunk)
+
+    def close(self):
+        self.solved = self.error_index is None and self.state.solved
+
+# Writes packed moves to a file path or an open binary file object
+class FileSink:
+    def __init__(self, target):
+        self.owns_file = isinstance(target, str)
+        self.file = open(target, "wb") if self.owns_file else target
+        self.count = 0
+
+    def write(self, chunk):
+        self.file.write(chunk)
+        self.count += len(chunk)
+
+    def close(self):
+        if self.owns_file:
+            self.file.close()
+        else:
+            self.file.flush()
+
+# Sends packed moves over a TCP connection, to an (host, port) address or an already connected socket
+class NetworkSink:
+    def __init__(self, target, timeout=10):
+        self.owns_socket = isinstance(target, tuple)
+        self.sock = socket.create_connection(target, timeout=timeout) if self.owns_socket else target
+        self.count = 0
+
+    def write(self, chunk):
+        self.sock.sendall(chunk)
+        self.count += len(chunk)
+
+    def close(self):
+        if self.owns_socket:
+            self.sock.close()
+
+# Drain a move stream into a sink in fixed-size chunks; returns (sink, elapsed seconds)
+# Timing covers generation plus whatever the sink does, so a CountingSink times pure generation.
+# on_chunk, if given, is called with the number of moves in each chunk once it is written,
+# and may raise to stop draining (the sink is then left open).
+def drain(moves, sink, chunk_size=65536, on_chunk=None):
+    moves = iter(moves)
+    start_time = time.time()
+    while True:
+        chunk = bytes(islice(moves, chunk_size))
+        if not chunk:
+            break
+        sink.write(chunk)
+        if on_chunk:
+            on_chunk(len(chunk))
+    sink.close()
+    end_time = time.time()
+    
+    return sink, end_time - start_time
@@ -0,0 +1,89 @@
+import threading
+from collections import OrderedDict
+
+from algorithms import solve_hanoi_recursive, solve_hanoi_iterative, solve_frame_stewart_pegs
+
+# Solvers the cache can fill from: algorithm -> function(n, pegs) returning (packed moves, elapsed)
+# pegs lists the peg names as [source, auxiliaries..., destination]
+SOLVERS = {
+    "recursive": lambda n, pegs: solve_hanoi_recursive(n, *pegs, packed=True),
+    "iterative": lambda n, pegs: solve_hanoi_iterative(n, *pegs, packed=True),
+    "frame-stewart": lambda n, pegs: solve_frame_stewart_pegs(n, pegs, packed=True),
+}
+
+# The solutions the app asks for: 5-10 disks, 3 pegs for the classic solvers and 4 for Frame-Stewart
+WARM_SOLUTIONS = [(algorithm, n, pegs)
+                  for n in range(5, 11)
+                  for algorithm, pegs in (("recursive", "ABC"), ("iterative", "ABC"), ("frame-stewart", "ABCD"))]
+
+# Process-wide cache of packed solutions, shared by every session.
+# Entries are keyed by (algorithm, n, pegs) and evicted least recently used first
+# once the stored moves exceed max_bytes. Cached moves are immutable bytes, so they can be shared.
+class SolutionCache:
+    def __init__(self, max_bytes=8 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.size_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    # Get (moves, elapsed) for a solution, solving and caching it on a miss.
+    # elapsed is the time the original solve took, so callers can still report it.
+    def get(self, algorithm, n, pegs):
+        moves, elapsed, _ = self.lookup(algorithm, n, pegs)
+        return moves, elapsed
+
+    # Like get, but returns (moves, elapsed, cached); cached is True when elapsed comes from an
+    # earlier solve, so it is not a new measurement
+    def lookup(self, algorithm, n, pegs):
+        key = (algorithm, n, tuple(pegs))
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry + (True,)
+            self.misses += 1
+
+        # Solve outside the lock so other sessions are not held up
+        moves, elapsed = SOLVERS[algorithm](n, list(pegs))
+        entry = (bytes(moves), elapsed)
+        if len(entry[0]) <= self.max_bytes:
+            with self._lock:
+                if key not in self._entries:
+                    self._entries[key] = entry
+                    self.size_bytes += len(entry[0])
+                    while self.size_bytes > self.max_bytes:
+                        _, (evicted, _) = self._entries.popitem(last=False)
+                        self.size_bytes -= len(evicted)
+        return entry + (False,)
+
+    # Fill the cache with the given (algorithm, n, pegs) solutions
+    def warm(self, solutions=WARM_SOLUTIONS):
+        for algorithm, n, pegs in solutions:
+            self.get(algorithm, n, pegs)
+
+    # Warm the cache on a daemon thread so server start is not delayed
+    def warm_in_background(self, solutions=WARM_SOLUTIONS):
+        thread = threading.Thread(target=self.warm, args=(solutions,), name="solution-cache-warmup", daemon=True)
+        thread.start()
+        return thread
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.size_bytes = 0
+
+    def stats(self):
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "size_bytes": self.size_bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+            }
+
+# The shared cache for this process
+solution_cache = SolutionCache()
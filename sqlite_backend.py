@@ -0,0 +1,188 @@
+import json
+import queue
+import sqlite3
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+
+from storage import StorageBackend, BENCHMARK_FIELDS, SUMMARY_FIELDS
+from storage import fold_summary, build_summaries, summary_key
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS user_games (
+    id TEXT PRIMARY KEY,
+    player_name TEXT NOT NULL,
+    disk_count INTEGER NOT NULL,
+    pegs INTEGER NOT NULL,
+    moves_count INTEGER NOT NULL,
+    move_sequence TEXT,
+    move_sequence_id TEXT,
+    timestamp TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS user_games_leaderboard ON user_games (disk_count, pegs, moves_count, timestamp);
+
+CREATE TABLE IF NOT EXISTS algorithm_performance (
+    id TEXT PRIMARY KEY,
+    algorithm TEXT NOT NULL,
+    disk_count INTEGER NOT NULL,
+    execution_time REAL NOT NULL,
+    moves_count INTEGER NOT NULL,
+    timestamp TEXT NOT NULL,
+    parameters TEXT,
+    notes TEXT,
+    move_sequence TEXT,
+    move_sequence_id TEXT
+);
+CREATE INDEX IF NOT EXISTS algorithm_performance_history ON algorithm_performance (disk_count, execution_time, id);
+
+CREATE TABLE IF NOT EXISTS algorithm_summaries (
+    id TEXT PRIMARY KEY,
+    summary TEXT NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS move_sequences (
+    id TEXT PRIMARY KEY,
+    moves_count INTEGER NOT NULL,
+    chunk_count INTEGER NOT NULL,
+    encoding TEXT NOT NULL,
+    timestamp TEXT NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS move_sequence_chunks (
+    sequence_id TEXT NOT NULL,
+    chunk_index INTEGER NOT NULL,
+    data BLOB NOT NULL,
+    PRIMARY KEY (sequence_id, chunk_index)
+);
+"""
+
+# Local SQLite storage, for development, CI and on-prem deployments.
+# Connections come from a small pool shared by all sessions; the database runs in WAL mode so
+# readers never block the writer. Writes are synchronous (a local commit is cheap), and the
+# leaderboard is a plain indexed query rather than a precomputed document.
+class SQLiteBackend(StorageBackend):
+    def __init__(self, path="hanoi.db", pool_size=4, timeout=30):
+        self.path = path
+        self._pool = queue.Queue()
+        for _ in range(pool_size):
+            connection = sqlite3.connect(path, timeout=timeout, check_same_thread=False)
+            connection.row_factory = sqlite3.Row
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            self._pool.put(connection)
+        # Summaries are read-modify-write, so updates to them are serialized
+        self._summary_lock = threading.Lock()
+        with self._connection() as connection:
+            connection.executescript(SCHEMA)
+
+    # Borrow a pooled connection; the block runs as one transaction
+    @contextmanager
+    def _connection(self):
+        connection = self._pool.get()
+        try:
+            with connection:
+                yield connection
+        finally:
+            self._pool.put(connection)
+
+    def close(self):
+        while not self._pool.empty():
+            self._pool.get().close()
+
+    def save_user_game(self, record_id, record):
+        with self._connection() as connection:
+            connection.execute(
+                "INSERT OR REPLACE INTO user_games (id, player_name, disk_count, pegs, moves_count, move_sequence, move_sequence_id, timestamp) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (record_id, record["player_name"], record["disk_count"], record["pegs"], record["moves_count"],
+                 record.get("move_sequence"), record.get("move_sequence_id"), record["timestamp"].isoformat()))
+        self._changed()
+
+    def save_algorithm_performance(self, record_id, record):
+        summary_id = summary_key(record)
+        with self._summary_lock, self._connection() as connection:
+            connection.execute(
+                "INSERT OR REPLACE INTO algorithm_performance (id, algorithm, disk_count, execution_time, moves_count, timestamp, "
+                "parameters, notes, move_sequence, move_sequence_id) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (record_id, record["algorithm"], record["disk_count"], record["execution_time"], record["moves_count"],
+                 record["timestamp"].isoformat(), json.dumps(record["parameters"]), record["notes"],
+                 record.get("move_sequence"), record.get("move_sequence_id")))
+
+            row = connection.execute("SELECT summary FROM algorithm_summaries WHERE id = ?", (summary_id,)).fetchone()
+            summary = fold_summary(json.loads(row["summary"]) if row else None, record_id, record)
+            if summary is not None:
+                connection.execute("INSERT OR REPLACE INTO algorithm_summaries (id, summary) VALUES (?, ?)",
+                                   (summary_id, json.dumps(summary, default=datetime.isoformat)))
+        self._changed()
+
+    def rebuild_algorithm_summaries(self):
+        with self._summary_lock, self._connection() as connection:
+            rows = connection.execute(
+                "SELECT id, algorithm, disk_count, execution_time, timestamp, parameters FROM algorithm_performance "
+                "ORDER BY timestamp, id").fetchall()
+            records = [(row["id"], dict(row, timestamp=datetime.fromisoformat(row["timestamp"]),
+                                        parameters=json.loads(row["parameters"]))) for row in rows]
+            connection.execute("DELETE FROM algorithm_summaries")
+            connection.executemany("INSERT INTO algorithm_summaries (id, summary) VALUES (?, ?)",
+                                   [(summary_id, json.dumps(summary, default=datetime.isoformat))
+                                    for summary_id, summary in build_summaries(records).items()])
+        self._changed()
+        return len(records)
+
+    def save_move_sequence(self, sequence_id, moves_count, chunks, on_saved=None):
+        with self._connection() as connection:
+            connection.executemany(
+                "INSERT OR REPLACE INTO move_sequence_chunks (sequence_id, chunk_index, data) VALUES (?, ?, ?)",
+                [(sequence_id, i, chunk) for i, chunk in enumerate(chunks)])
+            connection.execute(
+                "INSERT OR REPLACE INTO move_sequences (id, moves_count, chunk_count, encoding, timestamp) VALUES (?, ?, ?, ?, ?)",
+                (sequence_id, moves_count, len(chunks), "packed+zlib", datetime.now().isoformat()))
+        if on_saved:
+            on_saved()
+
+    def load_move_sequence(self, sequence_id):
+        with self._connection() as connection:
+            header = connection.execute("SELECT chunk_count FROM move_sequences WHERE id = ?", (sequence_id,)).fetchone()
+        if header is None:
+            return
+        for i in range(header["chunk_count"]):
+            with self._connection() as connection:
+                row = connection.execute("SELECT data FROM move_sequence_chunks WHERE sequence_id = ? AND chunk_index = ?",
+                                         (sequence_id, i)).fetchone()
+            yield row["data"]
+
+    def get_user_leaderboard(self, disk_count, pegs, limit):
+        with self._connection() as connection:
+            rows = connection.execute(
+                "SELECT player_name, disk_count, pegs, moves_count, timestamp FROM user_games "
+                "WHERE disk_count = ? AND pegs = ? ORDER BY moves_count, timestamp LIMIT ?",
+                (disk_count, pegs, limit)).fetchall()
+        return [dict(row, timestamp=datetime.fromisoformat(row["timestamp"])) for row in rows]
+
+    # Keyset pagination: the cursor is the (disk_count, execution_time, id) of the page's last row
+    def get_algorithm_benchmarks(self, page_size, start_after):
+        query = "SELECT id, " + ", ".join(BENCHMARK_FIELDS) + " FROM algorithm_performance"
+        arguments = []
+        if start_after is not None:
+            query += " WHERE (disk_count, execution_time, id) > (?, ?, ?)"
+            arguments = list(start_after)
+        query += " ORDER BY disk_count, execution_time, id LIMIT ?"
+        with self._connection() as connection:
+            rows = connection.execute(query, arguments + [page_size]).fetchall()
+
+        benchmarks = [{field: row[field] for field in BENCHMARK_FIELDS} for row in rows]
+        for benchmark in benchmarks:
+            benchmark["timestamp"] = datetime.fromisoformat(benchmark["timestamp"])
+            benchmark["parameters"] = json.loads(benchmark["parameters"])
+        cursor = (rows[-1]["disk_count"], rows[-1]["execution_time"], rows[-1]["id"]) if len(rows) == page_size else None
+        return benchmarks, cursor
+
+    def get_algorithm_summary(self):
+        with self._connection() as connection:
+            rows = connection.execute("SELECT summary FROM algorithm_summaries").fetchall()
+        summaries = []
+        for row in rows:
+            summary = json.loads(row["summary"])
+            summary["last_updated"] = datetime.fromisoformat(summary["last_updated"])
+            summaries.append({field: summary[field] for field in SUMMARY_FIELDS})
+        return summaries
@@ -0,0 +1,153 @@
+from abc import ABC, abstractmethod
+import math
+
+# Storage backends persist games, benchmark records and move sequences for database.py.
+# database.py builds the records (timestamps, ids, content hashes) and handles caching;
+# a backend only stores and queries them. FirestoreBackend lives in firestore_backend.py
+# and SQLiteBackend in sqlite_backend.py.
+
+# Leaderboards are ranked per (disk_count, pegs): fewest moves first, earliest game breaking ties
+LEADERBOARD_SIZE = 10
+LEADERBOARD_FIELDS = ["player_name", "disk_count", "pegs", "moves_count", "timestamp"]
+
+BENCHMARK_FIELDS = ["algorithm", "disk_count", "execution_time", "moves_count", "timestamp", "parameters", "notes"]
+
+# Per-(algorithm, disk_count, pegs) summaries: count and min cover every record,
+# median and p95 are taken over the most recent SUMMARY_SAMPLES runs
+SUMMARY_SAMPLES = 200
+# Ids of the records already counted in a summary, kept apart from the samples so a re-save is
+# recognised after it has left the sample window. Capped to keep a summary well inside Firestore's
+# 1 MiB document limit; only a re-save older than the last SUMMARY_COUNTED_IDS records is counted twice.
+SUMMARY_COUNTED_IDS = 10000
+SUMMARY_FIELDS = ["algorithm", "disk_count", "pegs", "count", "min", "median", "p95", "last_updated"]
+
+# Move sequences are stored in chunks of CHUNK_MOVES packed moves, each compressed separately
+CHUNK_MOVES = 512 * 1024
+
+# Abstract methods are what a backend must implement; the rest have working defaults.
+class StorageBackend(ABC):
+    # Called after a backend changes a leaderboard or summary, so cached reads can be dropped
+    on_change = None
+
+    # Save a game record under record_id, replacing any record with that id
+    @abstractmethod
+    def save_user_game(self, record_id, record):
+        raise NotImplementedError
+
+    # Save a benchmark record under record_id, replacing any record with that id
+    @abstractmethod
+    def save_algorithm_performance(self, record_id, record):
+        raise NotImplementedError
+
+    # Store a move sequence's compressed chunks under its content id.
+    # on_saved, if given, is called once the whole sequence is durably written (never if it is not).
+    @abstractmethod
+    def save_move_sequence(self, sequence_id, moves_count, chunks, on_saved=None):
+        raise NotImplementedError
+
+    # Yield the compressed chunks of a stored move sequence in order (nothing if it is unknown)
+    @abstractmethod
+    def load_move_sequence(self, sequence_id):
+        raise NotImplementedError
+
+    # Top games for one board as a list of dicts with LEADERBOARD_FIELDS
+    @abstractmethod
+    def get_user_leaderboard(self, disk_count, pegs, limit):
+        raise NotImplementedError
+
+    # One page of benchmark records as (list of dicts with BENCHMARK_FIELDS, cursor for the next page or None)
+    @abstractmethod
+    def get_algorithm_benchmarks(self, page_size, start_after):
+        raise NotImplementedError
+
+    # Every benchmark summary as a list of dicts with SUMMARY_FIELDS
+    @abstractmethod
+    def get_algorithm_summary(self):
+        raise NotImplementedError
+
+    # One-off migration: make games saved by older versions rank on the leaderboards.
+    # Returns the number of games updated.
+    def backfill_leaderboards(self):
+        return 0
+
+    # One-off migration: rebuild every benchmark summary from the saved benchmark records,
+    # so records saved before summaries existed are charted. Returns the number of records folded in.
+    @abstractmethod
+    def rebuild_algorithm_summaries(self):
+        raise NotImplementedError
+
+    # Number of saves accepted but not yet written
+    def queue_depth(self):
+        return 0
+
+    # Block until every accepted save is written
+    def flush(self):
+        pass
+
+    def _changed(self):
+        if self.on_change:
+            self.on_change()
+
+# Peg count of a benchmark record, recorded in its parameters (3 when not given)
+def record_pegs(record):
+    return (record["parameters"] or {}).get("pegs", 3)
+
+# Merge a saved game into a leaderboard's entries; a game already on the board replaces its old entry
+def merge_leaderboard(entries, game_id, record, size=LEADERBOARD_SIZE):
+    entry = {field: record[field] for field in LEADERBOARD_FIELDS}
+    entry["game_id"] = game_id
+    entries = [e for e in entries if e["game_id"] != game_id] + [entry]
+    # Stored timestamps can come back timezone-aware while new ones are naive, so compare them as epoch seconds
+    entries.sort(key=lambda e: (e["moves_count"], e["timestamp"].timestamp()))
+    return entries[:size]
+
+# Build summaries from scratch out of (record id, record) pairs in save order; returns {summary id: summary}.
+# Records are grouped first and each summary is computed once, rather than folding them in one by one.
+def build_summaries(records):
+    groups = {}
+    for record_id, record in records:
+        group = groups.setdefault(summary_key(record), {})
+        if record_id not in group:
+            group[record_id] = record
+    summaries = {}
+    for summary_id, group in groups.items():
+        ids = list(group)
+        last = group[ids[-1]]
+        samples = [{"id": record_id, "time": group[record_id]["execution_time"]} for record_id in ids[-SUMMARY_SAMPLES:]]
+        summaries[summary_id] = _summary(last, len(ids), min(record["execution_time"] for record in group.values()),
+                                         samples, ids[-SUMMARY_COUNTED_IDS:])
+    return summaries
+
+# Id of the summary a benchmark record belongs to
+def summary_key(record):
+    return f"{record['algorithm']}|{record_pegs(record)}|{record['disk_count']}"
+
+# Fold a benchmark record into its summary (None for a new summary).
+# Returns the updated summary, or None when the record was already counted.
+def fold_summary(summary, record_id, record):
+    summary = summary or {"count": 0, "min": None, "samples": []}
+    # Summaries written before "counted" existed only know the ids in their samples
+    counted = summary.get("counted") or [sample["id"] for sample in summary["samples"]]
+    # Re-saving a record under the same id must not count it twice
+    if record_id in counted:
+        return None
+    samples = (summary["samples"] + [{"id": record_id, "time": record["execution_time"]}])[-SUMMARY_SAMPLES:]
+    minimum = record["execution_time"] if summary["min"] is None else min(summary["min"], record["execution_time"])
+    return _summary(record, summary["count"] + 1, minimum, samples, (counted + [record_id])[-SUMMARY_COUNTED_IDS:])
+
+# Summary document for the latest record of a group, given its running totals
+def _summary(record, count, minimum, samples, counted):
+    times = sorted(sample["time"] for sample in samples)
+    middle = len(times) // 2
+    return {
+        "algorithm": record["algorithm"],
+        "disk_count": record["disk_count"],
+        "pegs": record_pegs(record),
+        "count": count,
+        "min": minimum,
+        "median": times[middle] if len(times) % 2 else (times[middle - 1] + times[middle]) / 2,
+        "p95": times[max(0, math.ceil(0.95 * len(times)) - 1)],
+        "last_updated": record["timestamp"],
+        "samples": samples,
+        "counted": counted
+    }
@@ -0,0 +1,477 @@
+import gc
+import io
+import threading
+import time
+from datetime import datetime, timezone
+
+import pytest
+
+import benchmark
+import database
+import parallel
+import storage
+
+from algorithms import solve_hanoi_recursive, solve_hanoi_iterative, solve_hanoi_vectorized
+from algorithms import solve_frame_stewart_pegs, frame_stewart_move_count, hanoi_move_at, hanoi_state_after
+from algorithms import fill_hanoi_iterative, iter_hanoi_iterative, iter_hanoi_recursive
+from corpus import SolutionCorpus
+from firestore_backend import FirestoreBackend, WriteBehindQueue
+from game_logic import PackedState
+from jobs import JobRunner, JobCancelled, JobLimitError, DONE, CANCELLED
+from moves import PEG_NAMES, encode_move, format_moves, format_move_lines
+from sinks import CountingSink, CollectingSink, ValidatingSink, FileSink, drain
+from solution_cache import SolutionCache
+from sqlite_backend import SQLiteBackend
+from storage import StorageBackend, build_summaries, fold_summary, merge_leaderboard
+from validation import CHUNK_SIZE, MoveStreamParser, iter_chunks, parse_move_sequence, validate_move_sequence
+
+# Run tests with: python -m pytest
+
+SMALL_DISKS = range(1, 11)
+
+# Parse a sequence through the streaming parser in chunks of the given size
+def parse_in_chunks(text, size, pegs=3):
+    parser = MoveStreamParser(pegs)
+    moves = bytearray()
+    for chunk in iter_chunks(text, size):
+        moves += parser.feed(chunk)[0]
+    parser.finish()
+    return bytes(moves), parser.error_index, parser.error_offset, parser.error
+
+# Replay packed moves on a fresh board; returns (index of the first illegal move or None, solved)
+def replay(moves, n, pegs):
+    state = PackedState(n, pegs, destination=pegs - 1)
+    return state.apply_moves(moves), state.solved
+
+VALID_SEQUENCE = format_moves(solve_hanoi_recursive(6, 'A', 'B', 'C', packed=True)[0])
+
+@pytest.mark.parametrize("text", [
+    VALID_SEQUENCE,
+    VALID_SEQUENCE.replace(",", "\n").replace("->", "-"),
+    " a -> b ; B>C\r\n  CA,",
+    VALID_SEQUENCE[:101] + "X" + VALID_SEQUENCE[102:],
+    VALID_SEQUENCE[:100] + ",," + VALID_SEQUENCE[100:],
+    "A->B,B->D",
+    "A->B,A->",
+    "",
+])
+def test_parser_is_independent_of_chunk_size(text):
+    expected = parse_in_chunks(text, CHUNK_SIZE)
+    for size in (1, 3):
+        assert parse_in_chunks(text, size) == expected
+
+def test_parser_reports_character_offsets():
+    _, error_index, error_offset, error = parse_in_chunks("A->B, B->C,\n  A=>C", 1)
+    assert (error_index, error_offset) == (2, 15)
+    assert "move 3, character 16" in error
+    _, error_index, error_offset, _ = parse_in_chunks("A->B,B->D", 3)
+    assert (error_index, error_offset) == (1, 8)
+
+def test_validation_locates_illegal_moves():
+    text = VALID_SEQUENCE[:100] + "C->A" + VALID_SEQUENCE[104:]
+    for size in (1, 3, CHUNK_SIZE):
+        result = validate_move_sequence(iter_chunks(text, size), 6, 3, 'C')
+        assert (result.error_index, result.error_offset) == (20, 100)
+    assert validate_move_sequence(VALID_SEQUENCE, 6, 3, 'C').solved
+
+@pytest.mark.parametrize("n", SMALL_DISKS)
+def test_solvers_and_oracle_match_recursive(n):
+    expected, _ = solve_hanoi_recursive(n, 'A', 'B', 'C', packed=True)
+    assert solve_hanoi_iterative(n, 'A', 'B', 'C', packed=True)[0] == expected
+    assert solve_hanoi_vectorized(n, 'A', 'B', 'C', packed=True)[0] == expected
+    assert bytes(hanoi_move_at(n, k) for k in range(1, 1 << n)) == expected
+
+    state = PackedState(n, 3)
+    for k, move in enumerate(expected):
+        assert {peg: state[peg] for peg in "ABC"} == {peg: disks for peg, disks in hanoi_state_after(n, k).items() if peg in "ABC"}
+        state.apply_moves([move])
+
+@pytest.fixture(scope="module")
+def corpus():
+    corpus = SolutionCorpus()
+    yield corpus
+    corpus.close()
+
+@pytest.mark.parametrize("n", SMALL_DISKS)
+def test_corpus_matches_solvers(corpus, n):
+    expected, _ = solve_hanoi_recursive(n, 'A', 'B', 'C', packed=True)
+    assert corpus.moves(n, 3) == expected
+    assert bytes(corpus.move_at(n, k, 3) for k in range(1, len(expected) + 1)) == expected
+
+    expected, _ = solve_frame_stewart_pegs(n, list("ABCD"), packed=True)
+    assert corpus.moves(n, 4) == expected
+    assert bytes(corpus.move_at(n, k, 4) for k in range(1, len(expected) + 1)) == expected
+
+@pytest.mark.parametrize("pegs", [3, 4, 5, 6])
+@pytest.mark.parametrize("n", SMALL_DISKS)
+def test_frame_stewart_is_legal_and_minimal(n, pegs):
+    moves, _ = solve_frame_stewart_pegs(n, list(PEG_NAMES[:pegs]), packed=True)
+    assert len(moves) == frame_stewart_move_count(n, pegs)
+    assert replay(moves, n, pegs) == (None, True)
+
+@pytest.fixture
+def sqlite_backend(tmp_path):
+    backend = SQLiteBackend(str(tmp_path / "hanoi.db"))
+    yield backend
+    backend.close()
+
+def test_sqlite_saves_are_idempotent(sqlite_backend):
+    game = {"player_name": "amy", "disk_count": 3, "pegs": 3, "moves_count": 7, "timestamp": datetime(2024, 1, 1)}
+    benchmark = {"algorithm": "Recursive (3 pegs)", "disk_count": 3, "execution_time": 0.1, "moves_count": 7,
+                 "timestamp": datetime(2024, 1, 1), "parameters": {"pegs": 3}, "notes": None}
+    for _ in range(2):
+        sqlite_backend.save_user_game("game", game)
+        sqlite_backend.save_algorithm_performance("run", benchmark)
+        sqlite_backend.save_move_sequence("sequence", 2, [b"first", b"second"])
+
+    assert len(sqlite_backend.get_user_leaderboard(3, 3, 10)) == 1
+    assert len(sqlite_backend.get_algorithm_benchmarks(10, None)[0]) == 1
+    assert [summary["count"] for summary in sqlite_backend.get_algorithm_summary()] == [1]
+    assert list(sqlite_backend.load_move_sequence("sequence")) == [b"first", b"second"]
+
+    assert sqlite_backend.rebuild_algorithm_summaries() == 1
+    assert [summary["count"] for summary in sqlite_backend.get_algorithm_summary()] == [1]
+
+# Wait for a job to leave the queued/running states
+def wait_for(job, timeout=10):
+    deadline = time.time() + timeout
+    while job.active and time.time() < deadline:
+        time.sleep(0.01)
+    return job.status
+
+def test_job_runner_limits_jobs_per_owner_and_in_total():
+    runner = JobRunner(max_workers=1, max_active_per_owner=1, max_queued=2)
+    release = threading.Event()
+    first = runner.submit("amy", "first", lambda job: release.wait())
+    with pytest.raises(JobLimitError):
+        runner.submit("amy", "second", lambda job: None)
+    runner.submit("bob", "queued", lambda job: None)
+    with pytest.raises(JobLimitError):
+        runner.submit("cat", "over the limit", lambda job: None)
+    release.set()
+    assert wait_for(first) == DONE
+    assert [job.description for job in runner.jobs_for("amy")] == ["first"]
+
+def test_job_runner_cancels_queued_and_running_jobs():
+    runner = JobRunner(max_workers=1, max_active_per_owner=2)
+
+    def count_forever(job):
+        done = 0
+        while True:
+            done += 1
+            job.progress(done, 0)
+            time.sleep(0.001)
+
+    running = runner.submit("amy", "running", count_forever)
+    queued = runner.submit("amy", "queued", lambda job: "never runs")
+    runner.cancel(queued.id)
+    runner.cancel(running.id)
+    assert wait_for(running) == CANCELLED
+    assert wait_for(queued) == CANCELLED
+    assert queued.result is None
+
+def test_job_runner_prunes_finished_jobs():
+    runner = JobRunner(keep_seconds=0)
+    job = runner.submit("amy", "done", lambda job: 42)
+    assert wait_for(job) == DONE and job.result == 42
+    runner.submit("bob", "next", lambda job: None)
+    assert runner.get(job.id) is None
+
+def test_run_benchmarks_reports_progress_up_to_the_total():
+    calls = []
+    benchmark.run_benchmarks(["Iterative, streamed (3 pegs)", "Iterative (3 pegs)"], [17], 2, 1, progress=lambda done, total: calls.append((done, total)))
+    total = 2 * 3 * ((1 << 17) - 1)
+    assert calls[0] == (0, total) and calls[-1] == (total, total)
+    # Streamed runs report once per chunk, not just once per run
+    assert len(calls) > 2 * 3 + 1
+
+def test_run_benchmarks_stops_within_a_streamed_run():
+    def cancel_early(done, total):
+        if done:
+            raise JobCancelled()
+    start = time.time()
+    with pytest.raises(JobCancelled):
+        benchmark.run_benchmarks(["Recursive, streamed (3 pegs)"], [24], progress=cancel_early)
+    assert time.time() - start < 5
+
+def test_concurrent_benchmarks_are_not_serialized_and_restore_gc():
+    assert gc.isenabled()
+    # A memory run holding the tracer must not hold up other jobs' timed runs
+    with benchmark._trace_lock:
+        row = benchmark.benchmark_algorithm("Iterative (3 pegs)", 10, repetitions=2, warmup=0)
+    assert row["moves_count"] == 1023
+
+    threads = [threading.Thread(target=benchmark.benchmark_algorithm, args=("Iterative (3 pegs)", 12, 5, 0)) for _ in range(3)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert gc.isenabled()
+
+def test_waiting_for_the_tracer_can_be_cancelled():
+    cancelled = threading.Event()
+
+    def on_moves(count):
+        if cancelled.is_set():
+            raise JobCancelled()
+
+    errors = []
+    def run():
+        try:
+            benchmark.benchmark_algorithm("Iterative (3 pegs)", 8, 1, 0, measure_memory=True, on_moves=on_moves)
+        except JobCancelled as e:
+            errors.append(e)
+
+    with benchmark._trace_lock:
+        thread = threading.Thread(target=run)
+        thread.start()
+        time.sleep(0.1)
+        cancelled.set()
+        thread.join(timeout=2 * benchmark.TRACE_WAIT_INTERVAL + 1)
+        assert not thread.is_alive() and errors
+
+def test_large_comparisons_default_to_fast_runners():
+    assert benchmark.default_algorithms(10) == benchmark.offered_algorithms(10)
+    assert "Recursive, streamed (3 pegs)" in benchmark.offered_algorithms(30)
+    assert "Recursive, streamed (3 pegs)" not in benchmark.default_algorithms(30)
+    # Estimates grow with the move count: one more disk doubles a 3-peg run
+    one_run = benchmark.estimate_seconds(["Iterative, streamed (3 pegs)"], 25, 1)
+    assert benchmark.estimate_seconds(["Iterative, streamed (3 pegs)"], 26, 6) == pytest.approx(12 * one_run, rel=1e-6)
+
+def test_solution_cache_reports_hits_and_evicts_least_recently_used():
+    cache = SolutionCache(max_bytes=(1 << 8) + (1 << 7))
+    moves, _, cached = cache.lookup("iterative", 8, "ABC")
+    assert not cached and moves == solve_hanoi_iterative(8, 'A', 'B', 'C', packed=True)[0]
+    assert cache.lookup("iterative", 8, "ABC")[2]
+    cache.get("recursive", 7, "ABC")
+    # Using the 8-disk entry makes the 7-disk one the least recently used
+    cache.get("iterative", 8, "ABC")
+    cache.get("iterative", 6, "ABC")
+    stats = cache.stats()
+    assert stats["entries"] == 2 and stats["size_bytes"] <= stats["max_bytes"]
+    assert cache.lookup("iterative", 8, "ABC")[2]
+    assert not cache.lookup("recursive", 7, "ABC")[2]
+
+def test_solution_cache_skips_solutions_over_the_budget():
+    cache = SolutionCache(max_bytes=100)
+    assert len(cache.get("iterative", 8, "ABC")[0]) == 255
+    assert cache.stats()["entries"] == 0
+
+@pytest.mark.parametrize("n", [1, 2, 7, 12])
+def test_fill_hanoi_iterative_writes_into_a_memoryview(n):
+    expected, _ = solve_hanoi_recursive(n, 'B', 'A', 'C', packed=True)
+    out = bytearray(len(expected) + 2)
+    with memoryview(out)[1:-1] as target:
+        fill_hanoi_iterative(target, n, 'B', 'A', 'C')
+    assert out[1:-1] == expected and out[0] == out[-1] == 0
+
+def test_parallel_solver_matches_serial(monkeypatch):
+    monkeypatch.setattr(parallel, "MIN_PARALLEL_MOVES", 2)
+    for n, pegs in [(1, "ABC"), (9, "CAB"), (12, "ABC"), (9, "BDCA"), (10, "ABCDE")]:
+        moves, _ = parallel.solve_parallel(n, list(pegs), workers=2, packed=True)
+        if len(pegs) == 3:
+            assert moves == solve_hanoi_iterative(n, *pegs, packed=True)[0]
+        else:
+            assert moves == solve_frame_stewart_pegs(n, list(pegs), packed=True)[0]
+
+# Minimal stand-in for a Firestore client: documents live in a dict keyed by path,
+# batches apply their writes on commit, and the next `failures` commits raise
+class FakeDocument:
+    def __init__(self, client, path):
+        self.client, self.path = client, path
+
+    def collection(self, name):
+        return FakeCollection(self.client, f"{self.path}/{name}")
+
+class FakeCollection:
+    def __init__(self, client, path):
+        self.client, self.path = client, path
+
+    def document(self, name):
+        return FakeDocument(self.client, f"{self.path}/{name}")
+
+class FakeBatch:
+    def __init__(self, client):
+        self.client, self.writes = client, []
+
+    def set(self, doc_ref, record):
+        self.writes.append((doc_ref.path, record))
+
+    def commit(self):
+        self.client.commits.append([path for path, _ in self.writes])
+        if self.client.failures:
+            self.client.failures -= 1
+            raise RuntimeError("unavailable")
+        self.client.documents.update(self.writes)
+
+class FakeFirestore:
+    def __init__(self, failures=0):
+        self.documents = {}
+        self.commits = []
+        self.failures = failures
+
+    def collection(self, name):
+        return FakeCollection(self, name)
+
+    def batch(self):
+        return FakeBatch(self)
+
+@pytest.fixture
+def fake_firestore():
+    client = FakeFirestore()
+    backend = FirestoreBackend(client, WriteBehindQueue(client, flush_interval=0.01, max_retries=1, backoff=0))
+    yield client, backend
+    backend.write_queue.close()
+
+def test_dropped_move_sequences_are_written_again(fake_firestore, monkeypatch):
+    client, backend = fake_firestore
+    monkeypatch.setattr(database, "init_storage", lambda: backend)
+    moves = bytes(solve_hanoi_iterative(12, 'A', 'B', 'C', packed=True)[0]) * 200
+
+    client.failures = 2
+    sequence_id = database.save_move_sequence(moves)
+    backend.flush()
+    assert sequence_id not in database._stored_sequences
+    assert f"move_sequences/{sequence_id}" not in client.documents
+
+    database.save_move_sequence(moves)
+    backend.flush()
+    assert sequence_id in database._stored_sequences
+    assert client.documents[f"move_sequences/{sequence_id}"]["chunk_count"] == 2
+    # The header is committed after both chunks
+    assert client.commits[-1] == [f"move_sequences/{sequence_id}"]
+
+def test_write_behind_queue_batches_and_counts_only_writes(fake_firestore):
+    client, backend = fake_firestore
+    queue = WriteBehindQueue(client, max_batch=3, flush_interval=0.2, max_retries=0)
+    release = threading.Event()
+    queue.put_task(release.wait)
+    for i in range(5):
+        queue.put(client.collection("games").document(str(i)), {"i": i})
+    queue.put_task(lambda: None)
+    # The blocked task is not a write; the queued tasks are not counted either
+    assert queue.depth() == 5
+    release.set()
+    queue.flush()
+    assert queue.depth() == 0
+    assert all(len(commit) <= 3 for commit in client.commits)
+    assert sorted(path for commit in client.commits for path in commit) == [f"games/{i}" for i in range(5)]
+    queue.close()
+
+def test_write_behind_queue_retries_and_drops(fake_firestore):
+    client, backend = fake_firestore
+    queue = WriteBehindQueue(client, flush_interval=0.01, max_retries=2, backoff=0)
+    committed = []
+    client.failures = 2
+    queue.put(client.collection("games").document("kept"), {"ok": True}, lambda: committed.append("kept"))
+    queue.flush()
+    client.failures = 3
+    queue.put(client.collection("games").document("dropped"), {"ok": False}, lambda: committed.append("dropped"))
+    queue.flush()
+    assert committed == ["kept"] and queue.failed == 1
+    assert "games/kept" in client.documents and "games/dropped" not in client.documents
+    queue.close()
+
+def test_write_behind_queue_runs_tasks_after_earlier_writes(fake_firestore):
+    client, backend = fake_firestore
+    queue = WriteBehindQueue(client, flush_interval=0.01)
+    seen = []
+    queue.put(client.collection("games").document("first"), {})
+    queue.put_task(lambda: seen.append("games/first" in client.documents))
+    queue.put(client.collection("games").document("second"), {})
+    queue.put_task(lambda: seen.append("games/second" in client.documents))
+    queue.close()
+    assert seen == [True, True]
+
+def test_downloaded_move_lines_parse_back():
+    moves = bytes(solve_frame_stewart_pegs(7, list("ABCD"), packed=True)[0])
+    text = format_move_lines(moves)
+    assert text.splitlines() == format_moves(moves).replace("->", "").split(",")
+    assert parse_move_sequence(text, 4) == (bytearray(moves), None, None)
+
+def benchmark_record(time_taken, second):
+    return {"algorithm": "Iterative", "disk_count": 8, "parameters": {"pegs": 3}, "execution_time": time_taken,
+            "timestamp": datetime(2024, 1, 1, 0, 0, second)}
+
+def test_fold_summary_ignores_resaves_outside_the_sample_window(monkeypatch):
+    monkeypatch.setattr(storage, "SUMMARY_SAMPLES", 3)
+    summary = None
+    for i in range(6):
+        summary = fold_summary(summary, f"run{i}", benchmark_record(float(i + 1), i))
+    assert [sample["id"] for sample in summary["samples"]] == ["run3", "run4", "run5"]
+    assert fold_summary(summary, "run0", benchmark_record(1.0, 59)) is None
+    assert (summary["count"], summary["min"], summary["median"], summary["p95"]) == (6, 1.0, 5.0, 6.0)
+
+def test_build_summaries_matches_folding(monkeypatch):
+    monkeypatch.setattr(storage, "SUMMARY_SAMPLES", 4)
+    records = [(f"run{i % 7}", benchmark_record(float((i * 5) % 11), i)) for i in range(10)]
+    folded = None
+    for record_id, record in records:
+        folded = fold_summary(folded, record_id, record) or folded
+    assert build_summaries(records) == {"Iterative|3|8": folded}
+
+def game_record(moves_count, second):
+    return {"player_name": "p", "disk_count": 4, "pegs": 3, "moves_count": moves_count,
+            "timestamp": datetime(2024, 1, 1, 0, 0, second)}
+
+def test_merge_leaderboard_ranks_replaces_and_trims():
+    entries = []
+    for i, moves_count in enumerate([20, 15, 15, 30]):
+        entries = merge_leaderboard(entries, f"g{i}", game_record(moves_count, i), size=3)
+    # Fewest moves first, the earlier game winning a tie; the slowest game falls off the board
+    assert [e["game_id"] for e in entries] == ["g1", "g2", "g0"]
+    entries = merge_leaderboard(entries, "g0", game_record(15, 0), size=3)
+    assert [e["game_id"] for e in entries] == ["g0", "g1", "g2"]
+    aware = game_record(15, 3) | {"timestamp": datetime(2025, 1, 1, tzinfo=timezone.utc)}
+    assert [e["game_id"] for e in merge_leaderboard(entries, "g4", aware, size=5)][-1] == "g4"
+
+def test_incomplete_storage_backend_fails_at_construction():
+    class GamesOnly(StorageBackend):
+        def save_user_game(self, record_id, record):
+            pass
+
+    with pytest.raises(TypeError, match="load_move_sequence"):
+        GamesOnly()
+
+def test_drain_feeds_every_sink_the_same_moves():
+    expected = bytes(solve_hanoi_iterative(10, 'A', 'B', 'C', packed=True)[0])
+    chunks = []
+    sink, _ = drain(iter_hanoi_recursive(10, 'A', 'B', 'C'), CollectingSink(), chunk_size=100, on_chunk=chunks.append)
+    assert bytes(sink.moves) == expected
+    assert chunks == [100] * 10 + [23]
+    assert drain(iter_hanoi_iterative(10, 'A', 'B', 'C'), CountingSink())[0].count == len(expected)
+    target = io.BytesIO()
+    assert drain(iter(expected), FileSink(target), chunk_size=7)[0].count == len(expected)
+    assert target.getvalue() == expected and not target.closed
+
+def test_drain_stops_when_on_chunk_raises():
+    sink = CountingSink()
+    def stop(count):
+        raise JobCancelled()
+    with pytest.raises(JobCancelled):
+        drain(iter_hanoi_iterative(10, 'A', 'B', 'C'), sink, chunk_size=100, on_chunk=stop)
+    assert sink.count == 100
+
+def test_validating_sink_reports_the_first_illegal_move_across_chunks():
+    moves = bytes(solve_hanoi_iterative(5, 'A', 'B', 'C', packed=True)[0])
+    sink, _ = drain(iter(moves), ValidatingSink(5), chunk_size=4)
+    assert (sink.count, sink.error_index, sink.solved) == (31, None, True)
+    # After six moves peg B is empty, so moving from it is illegal
+    broken = moves[:6] + bytes([encode_move('B', 'A')]) + moves[6:]
+    sink, _ = drain(iter(broken), ValidatingSink(5), chunk_size=4)
+    assert (sink.error_index, sink.solved) == (6, False)
+    sink, _ = drain(iter(moves[:-1]), ValidatingSink(5), chunk_size=4)
+    assert (sink.error_index, sink.solved) == (None, False)
+
+def test_packed_state_move_tracks_solved_incrementally():
+    state = PackedState(2, 3, destination=2)
+    assert not state.solved
+    assert state.move(0, 1) and state.move(0, 2) and not state.solved
+    assert state.move(1, 2) and state.solved
+    # Illegal moves leave the flag alone
+    assert not state.move(0, 1) and not state.move(2, 2) and state.solved
+    assert state.move(2, 0) and not state.solved
+    # Moving between the other pegs can't finish the puzzle
+    assert state.move(0, 1) and not state.solved
+    assert state.move(1, 2) and state.solved
+    assert PackedState(3, 3, masks=[0, 0, 0b111], destination=2).solved
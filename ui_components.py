@@ -1,13 +1,18 @@
 import streamlit as st
+import base64
+import json
+from functools import lru_cache
 
-# Render the Tower of Hanoi game board
-def render_game_board(state, n, pegs=3):
-    max_disk_width = 140  # Reduced from 180 to make pegs smaller
-    base_width = max_disk_width + 40  # Reduced from 60
-    
-    # Create CSS for the game board
-    st.markdown("""
-<style>
+from moves import PEG_NAMES, format_moves, format_move_lines
+
+MAX_DISK_WIDTH = 140
+BASE_WIDTH = MAX_DISK_WIDTH + 40
+
+# Boards with this many disks or more are drawn as a single SVG instead of one element per disk
+SVG_MIN_DISKS = 11
+
+# Board styles, shared by every board on the page
+BOARD_CSS = """
     body {
     background-color: #1e1e1e;
 }
@@ -79,220 +84,386 @@ def render_game_board(state, n, pegs=3):
     background-color: rgba(255,255,255,0.1);
     transform: scale(1.05);
 }
-</style>
-""", unsafe_allow_html=True)
+"""
 
+# Drag and drop script for the HTML board
+DRAG_DROP_JS = """
+<script>
+// Wait for DOM to fully load
+document.addEventListener('DOMContentLoaded', function() {
+    // Set up variables to store the drag state
+    let draggedDisk = null;
+    let sourcePeg = null;
     
-    # Draw the board
-    cols = st.columns(pegs)
-    peg_names = ['A', 'B', 'C', 'D'][:pegs]
+    // Add event listeners to all disks
+    const disks = document.querySelectorAll('.disk');
+    disks.forEach(disk => {
+        disk.addEventListener('dragstart', handleDragStart);
+        disk.addEventListener('dragend', handleDragEnd);
+    });
     
-    board_html = '<div class="game-board">'
+    // Add event listeners to all pegs
+    const pegs = document.querySelectorAll('.droppable');
+    pegs.forEach(peg => {
+        peg.addEventListener('dragover', handleDragOver);
+        peg.addEventListener('dragenter', handleDragEnter);
+        peg.addEventListener('dragleave', handleDragLeave);
+        peg.addEventListener('drop', handleDrop);
+    });
     
-    for i, peg in enumerate(peg_names):
-        tower_html = f'<div class="tower" id="tower-{peg}" data-peg="{peg}">'
+    // Drag start handler
+    function handleDragStart(e) {
+        // Only allow dragging the top disk on a peg
+        const peg = this.getAttribute('data-peg');
+        const pegs = Array.from(document.querySelectorAll(`[data-peg="${peg}"]`));
+        const disksOnPeg = pegs.filter(item => item.classList.contains('disk'));
         
-        # Calculate peg height based on number of disks
-        peg_height = (n * 28) + 20  # Reduced slightly
-        tower_html += f'<div class="peg droppable" id="peg-{peg}" style="height: {peg_height}px;" data-peg="{peg}"></div>'
+        // If this is not the top disk, don't allow dragging
+        if (disksOnPeg.length > 0 && disksOnPeg[0] !== this) {
+            e.preventDefault();
+            return false;
+        }
         
-        # Add disks
-        disks_html = ""
-        reversed_disks = reversed(state[peg])
-        for disk in reversed_disks:
-            # Calculate disk width proportional to its size
-            disk_width = 30 + ((disk / n) * max_disk_width)
-            # Generate a color based on disk size
-            hue = int(120 + (240 * (disk / n)))
-            disks_html += f'<div class="disk" id="disk-{disk}" data-size="{disk}" data-peg="{peg}" draggable="true" style="width: {disk_width}px; background-color: hsl({hue}, 70%, 50%);">{disk}</div>'
+        // Set drag data
+        draggedDisk = this;
+        sourcePeg = peg;
+        this.classList.add('dragging');
+        
+        e.dataTransfer.effectAllowed = 'move';
+        e.dataTransfer.setData('text/plain', this.id);
         
-        tower_html += disks_html
+        // For better visual feedback
+        setTimeout(() => {
+            this.style.opacity = '0.4';
+        }, 0);
         
-        # Add base
-        tower_html += f'<div class="base" style="width: {base_width}px;"></div>'
-        tower_html += f'<div style="text-align: center; margin-top: 8px;"><h3>{peg}</h3></div>'
-        tower_html += '</div>'
+        return true;
+    }
+    
+    // Drag end handler
+    function handleDragEnd() {
+        this.classList.remove('dragging');
+        this.style.opacity = '1';
         
-        board_html += tower_html
+        // Reset highlight on all drop targets
+        document.querySelectorAll('.droppable').forEach(peg => {
+            peg.classList.remove('highlight');
+        });
+    }
     
-    board_html += '</div>'
+    // Drag over handler
+    function handleDragOver(e) {
+        if (e.preventDefault) {
+            e.preventDefault(); // Allows us to drop
+        }
+        e.dataTransfer.dropEffect = 'move';
+        return false;
+    }
     
-    # Render the game board
-    st.markdown(board_html, unsafe_allow_html=True)
+    // Drag enter handler
+    function handleDragEnter() {
+        this.classList.add('highlight');
+    }
     
-    # Add JavaScript for drag and drop functionality
-    drag_drop_js = """
-    <script>
-    // Wait for DOM to fully load
-    document.addEventListener('DOMContentLoaded', function() {
-        // Set up variables to store the drag state
-        let draggedDisk = null;
-        let sourcePeg = null;
+    // Drag leave handler
+    function handleDragLeave() {
+        this.classList.remove('highlight');
+    }
+    
+    // Drop handler
+    function handleDrop(e) {
+        e.stopPropagation(); // Stops browser from redirecting
         
-        // Add event listeners to all disks
-        const disks = document.querySelectorAll('.disk');
-        disks.forEach(disk => {
-            disk.addEventListener('dragstart', handleDragStart);
-            disk.addEventListener('dragend', handleDragEnd);
-        });
+        // If no disk is being dragged, do nothing
+        if (!draggedDisk) return false;
         
-        // Add event listeners to all pegs
-        const pegs = document.querySelectorAll('.droppable');
-        pegs.forEach(peg => {
-            peg.addEventListener('dragover', handleDragOver);
-            peg.addEventListener('dragenter', handleDragEnter);
-            peg.addEventListener('dragleave', handleDragLeave);
-            peg.addEventListener('drop', handleDrop);
-        });
+        // Get target peg
+        const targetPeg = this.getAttribute('data-peg');
         
-        // Drag start handler
-        function handleDragStart(e) {
-            // Only allow dragging the top disk on a peg
-            const peg = this.getAttribute('data-peg');
-            const pegs = Array.from(document.querySelectorAll(`[data-peg="${peg}"]`));
-            const disksOnPeg = pegs.filter(item => item.classList.contains('disk'));
+        // Don't do anything if dropping onto the same peg
+        if (sourcePeg === targetPeg) {
+            return false;
+        }
+        
+        // Check if move is valid (smaller disk onto larger disk or empty peg)
+        const targetPegElement = document.querySelector(`#peg-${targetPeg}`);
+        const disksOnTargetPeg = Array.from(document.querySelectorAll(`[data-peg="${targetPeg}"].disk`));
+        
+        // If target peg has disks, check that the dragged disk is smaller than the top disk
+        if (disksOnTargetPeg.length > 0) {
+            const topDiskSize = parseInt(disksOnTargetPeg[0].getAttribute('data-size'));
+            const draggedDiskSize = parseInt(draggedDisk.getAttribute('data-size'));
             
-            // If this is not the top disk, don't allow dragging
-            if (disksOnPeg.length > 0 && disksOnPeg[0] !== this) {
-                e.preventDefault();
+            if (draggedDiskSize >= topDiskSize) {
+                // Invalid move: can't place larger disk on smaller disk
                 return false;
             }
-            
-            // Set drag data
-            draggedDisk = this;
-            sourcePeg = peg;
-            this.classList.add('dragging');
-            
-            e.dataTransfer.effectAllowed = 'move';
-            e.dataTransfer.setData('text/plain', this.id);
-            
-            // For better visual feedback
-            setTimeout(() => {
-                this.style.opacity = '0.4';
-            }, 0);
-            
-            return true;
         }
         
-        // Drag end handler
-        function handleDragEnd() {
-            this.classList.remove('dragging');
-            this.style.opacity = '1';
-            
-            // Reset highlight on all drop targets
-            document.querySelectorAll('.droppable').forEach(peg => {
-                peg.classList.remove('highlight');
+        // Update disk's data-peg attribute
+        draggedDisk.setAttribute('data-peg', targetPeg);
+        
+        // Add the move to a hidden input to track the sequence
+        const moveInput = document.getElementById('move-sequence') || createMoveSequenceInput();
+        const currentSequence = moveInput.value;
+        const newMove = `${sourcePeg}->${targetPeg}`;
+        moveInput.value = currentSequence ? `${currentSequence},${newMove}` : newMove;
+        
+        // Visually, we would need to append the disk to the target peg
+        // This example uses Streamlit which reloads on interaction
+        // In a real implementation, you'd update the DOM here
+        
+        // Trigger a Streamlit event to update the game state
+        if (window.parent.window.streamlitPythonInteractor) {
+            const moveData = {
+                source: sourcePeg,
+                destination: targetPeg
+            };
+            window.parent.window.streamlitPythonInteractor.sendDataToPython({
+                type: 'hanoi-move',
+                data: moveData
             });
         }
         
-        // Drag over handler
-        function handleDragOver(e) {
-            if (e.preventDefault) {
-                e.preventDefault(); // Allows us to drop
-            }
-            e.dataTransfer.dropEffect = 'move';
-            return false;
-        }
+        // Fallback to form submission for Streamlit
+        const form = document.createElement('form');
+        form.method = 'POST';
+        form.action = '';
         
-        // Drag enter handler
-        function handleDragEnter() {
-            this.classList.add('highlight');
-        }
+        const sourceInput = document.createElement('input');
+        sourceInput.type = 'hidden';
+        sourceInput.name = 'source';
+        sourceInput.value = sourcePeg;
+        form.appendChild(sourceInput);
         
-        // Drag leave handler
-        function handleDragLeave() {
-            this.classList.remove('highlight');
-        }
+        const destInput = document.createElement('input');
+        destInput.type = 'hidden';
+        destInput.name = 'destination';
+        destInput.value = targetPeg;
+        form.appendChild(destInput);
         
-        // Drop handler
-        function handleDrop(e) {
-            e.stopPropagation(); // Stops browser from redirecting
-            
-            // If no disk is being dragged, do nothing
-            if (!draggedDisk) return false;
-            
-            // Get target peg
-            const targetPeg = this.getAttribute('data-peg');
-            
-            // Don't do anything if dropping onto the same peg
-            if (sourcePeg === targetPeg) {
-                return false;
-            }
-            
-            // Check if move is valid (smaller disk onto larger disk or empty peg)
-            const targetPegElement = document.querySelector(`#peg-${targetPeg}`);
-            const disksOnTargetPeg = Array.from(document.querySelectorAll(`[data-peg="${targetPeg}"].disk`));
-            
-            // If target peg has disks, check that the dragged disk is smaller than the top disk
-            if (disksOnTargetPeg.length > 0) {
-                const topDiskSize = parseInt(disksOnTargetPeg[0].getAttribute('data-size'));
-                const draggedDiskSize = parseInt(draggedDisk.getAttribute('data-size'));
-                
-                if (draggedDiskSize >= topDiskSize) {
-                    // Invalid move: can't place larger disk on smaller disk
-                    return false;
-                }
-            }
-            
-            // Update disk's data-peg attribute
-            draggedDisk.setAttribute('data-peg', targetPeg);
-            
-            // Add the move to a hidden input to track the sequence
-            const moveInput = document.getElementById('move-sequence') || createMoveSequenceInput();
-            const currentSequence = moveInput.value;
-            const newMove = `${sourcePeg}->${targetPeg}`;
-            moveInput.value = currentSequence ? `${currentSequence},${newMove}` : newMove;
-            
-            // Visually, we would need to append the disk to the target peg
-            // This example uses Streamlit which reloads on interaction
-            // In a real implementation, you'd update the DOM here
-            
-            // Trigger a Streamlit event to update the game state
-            if (window.parent.window.streamlitPythonInteractor) {
-                const moveData = {
-                    source: sourcePeg,
-                    destination: targetPeg
-                };
-                window.parent.window.streamlitPythonInteractor.sendDataToPython({
-                    type: 'hanoi-move',
-                    data: moveData
-                });
-            }
-            
-            // Fallback to form submission for Streamlit
-            const form = document.createElement('form');
-            form.method = 'POST';
-            form.action = '';
-            
-            const sourceInput = document.createElement('input');
-            sourceInput.type = 'hidden';
-            sourceInput.name = 'source';
-            sourceInput.value = sourcePeg;
-            form.appendChild(sourceInput);
-            
-            const destInput = document.createElement('input');
-            destInput.type = 'hidden';
-            destInput.name = 'destination';
-            destInput.value = targetPeg;
-            form.appendChild(destInput);
-            
-            document.body.appendChild(form);
-            form.submit();
-            
-            return false;
-        }
+        document.body.appendChild(form);
+        form.submit();
         
-        // Helper function to create a hidden input for move sequence
-        function createMoveSequenceInput() {
-            const input = document.createElement('input');
-            input.type = 'hidden';
-            input.id = 'move-sequence';
-            input.name = 'move-sequence';
-            document.body.appendChild(input);
-            return input;
+        return false;
+    }
+    
+    // Helper function to create a hidden input for move sequence
+    function createMoveSequenceInput() {
+        const input = document.createElement('input');
+        input.type = 'hidden';
+        input.id = 'move-sequence';
+        input.name = 'move-sequence';
+        document.body.appendChild(input);
+        return input;
+    }
+});
+</script>
+"""
+
+# Install the board CSS and script once per session.
+# Styles added through st.markdown vanish with the element on the next rerun, so the CSS is
+# copied into the parent page's <head> instead, where it stays for the life of the page and
+# later reruns send nothing but the board itself.
+def load_board_assets():
+    if st.session_state.get("board_assets_loaded"):
+        return
+    st.iframe(DRAG_DROP_JS + """
+    <script>
+    const head = window.parent.document.head;
+    if (!head.querySelector('#hanoi-board-style')) {
+        const style = window.parent.document.createElement('style');
+        style.id = 'hanoi-board-style';
+        style.textContent = STYLE;
+        head.appendChild(style);
+    }
+    </script>
+    """.replace("STYLE", json.dumps(BOARD_CSS)), height="content")
+    st.session_state.board_assets_loaded = True
+
+# HTML for one board, memoized by (peg contents, n, pegs); towers lists each peg's disks bottom to top
+@lru_cache(maxsize=4096)
+def board_html(towers, n, pegs):
+    if n >= SVG_MIN_DISKS:
+        return board_svg(towers, n, pegs)
+    
+    peg_height = (n * 28) + 20
+    parts = ['<div class="game-board">']
+    for peg, disks in zip(PEG_NAMES[:pegs], towers):
+        parts.append(f'<div class="tower" id="tower-{peg}" data-peg="{peg}">')
+        parts.append(f'<div class="peg droppable" id="peg-{peg}" style="height: {peg_height}px;" data-peg="{peg}"></div>')
+        # Disks are listed top first; width and colour scale with disk size
+        for disk in reversed(disks):
+            disk_width = 30 + ((disk / n) * MAX_DISK_WIDTH)
+            hue = int(120 + (240 * (disk / n)))
+            parts.append(f'<div class="disk" id="disk-{disk}" data-size="{disk}" data-peg="{peg}" draggable="true" '
+                         f'style="width: {disk_width}px; background-color: hsl({hue}, 70%, 50%);">{disk}</div>')
+        parts.append(f'<div class="base" style="width: {BASE_WIDTH}px;"></div>')
+        parts.append(f'<div style="text-align: center; margin-top: 8px;"><h3>{peg}</h3></div>')
+        parts.append('</div>')
+    parts.append('</div>')
+    return "".join(parts)
+
+# One SVG for a large board: the drawing keeps a fixed height and disks get thinner as n grows,
+# so the page does not grow with the disk count
+def board_svg(towers, n, pegs, height=360):
+    tower_width = BASE_WIDTH + 40
+    width = tower_width * pegs
+    floor = height - 40
+    disk_height = (floor - 20) / n
+    parts = [f'<svg xmlns="http://www.w3.org/2000/svg" viewBox="0 0 {width} {height}" '
+             f'style="width: 100%; max-width: {width}px; height: auto; display: block; margin: 0 auto; background-color: #1e1e1e;">']
+    for i, (peg, disks) in enumerate(zip(PEG_NAMES[:pegs], towers)):
+        center = tower_width * i + tower_width / 2
+        parts.append(f'<rect x="{center - 4}" y="10" width="8" height="{floor - 10}" rx="4" fill="#8a5470"/>')
+        parts.append(f'<rect x="{center - BASE_WIDTH / 2}" y="{floor}" width="{BASE_WIDTH}" height="10" rx="5" fill="#b5526a"/>')
+        parts.append(f'<text x="{center}" y="{height - 8}" fill="white" font-size="18" text-anchor="middle">{peg}</text>')
+        for level, disk in enumerate(disks):
+            disk_width = 30 + ((disk / n) * MAX_DISK_WIDTH)
+            hue = int(120 + (240 * (disk / n)))
+            parts.append(f'<rect x="{center - disk_width / 2:.1f}" y="{floor - (level + 1) * disk_height:.1f}" '
+                         f'width="{disk_width:.1f}" height="{disk_height * 0.9:.1f}" rx="{min(disk_height / 2, 13):.1f}" '
+                         f'fill="hsl({hue}, 70%, 50%)"/>')
+    parts.append('</svg>')
+    return "".join(parts)
+
+# Render the Tower of Hanoi game board
+def render_game_board(state, n, pegs=3):
+    load_board_assets()
+    towers = tuple(tuple(state[peg]) for peg in PEG_NAMES[:pegs])
+    st.markdown(board_html(towers, n, pegs), unsafe_allow_html=True)
+
+
+# Show a packed move sequence one page at a time.
+# Only the visible page is formatted and sent; the full sequence is offered as a download,
+# generated only when the button is clicked. The page picker resets to the newest page
+# whenever the page count changes, so the log follows the game as moves are made.
+def render_move_log(moves, page_size=100):
+    total = len(moves)
+    pages = max(1, (total + page_size - 1) // page_size)
+    
+    col1, col2 = st.columns([3, 1])
+    with col2:
+        page = st.number_input(f"Page (of {pages})", min_value=1, max_value=pages, value=pages) if pages > 1 else 1
+    
+    start = (page - 1) * page_size
+    end = min(start + page_size, total)
+    with col1:
+        st.write(f"Move sequence (moves {start + 1}-{end} of {total}): " + format_moves(moves[start:end], ", "))
+    
+    snapshot = bytes(moves)
+    st.download_button("Download full sequence", data=lambda: format_move_lines(snapshot), file_name="hanoi-moves.txt", 
+                       mime="text/plain", on_click="ignore", key="move_log_download")
+
+# Replay a move sequence in the browser.
+# The packed moves (one byte each, see moves.py) are sent once, base64-encoded, and the component
+# animates them locally with play/pause, a seek bar and a speed control, so a replay of any length
+# costs a single server round trip. The sequence must already have been validated on the server.
+def render_replay(n, moves, pegs=3, moves_per_second=4):
+    config = json.dumps({
+        "n": n,
+        "pegs": pegs,
+        "moves": base64.b64encode(bytes(moves)).decode("ascii"),
+        "movesPerSecond": moves_per_second,
+        "maxDiskWidth": MAX_DISK_WIDTH,
+    })
+    
+    replay_html = """
+<style>
+    body { margin: 0; background-color: #1e1e1e; color: white; font-family: sans-serif; }
+    .game-board { display: flex; justify-content: center; align-items: flex-end; padding: 20px 0; }
+    .tower { display: flex; flex-direction: column; align-items: center; margin: 0 20px; }
+    .peg { width: 8px; background: linear-gradient(180deg, #ff4e50, #6b5b95); border-radius: 4px; margin-bottom: 8px; }
+    .disk { border-radius: 18px; text-align: center; font-weight: bold; height: 26px; line-height: 26px;
+            box-shadow: 0 0 6px rgba(0,0,0,0.5); margin: 4px 0; }
+    .base { background: linear-gradient(90deg, #ff4e50, #6b5b95); height: 10px; border-radius: 5px; margin-top: 8px; }
+    .tower-label { font-size: 18px; margin-top: 8px; }
+    .controls { display: flex; justify-content: center; align-items: center; gap: 12px; padding: 8px; }
+    .controls input[type=range] { width: 50%; }
+</style>
+<div class="controls">
+    <button id="play">Pause</button>
+    <input id="seek" type="range" min="0" value="0">
+    <span id="position"></span>
+    <select id="speed"></select>
+</div>
+<div class="game-board" id="board"></div>
+<script>
+    const config = CONFIG;
+    const names = "ABCDEFGHIJKLMNOP".slice(0, config.pegs);
+    const moves = Uint8Array.from(atob(config.moves), c => c.charCodeAt(0));
+    let towers, index = 0, playing = moves.length > 0, speed = config.movesPerSecond, carry = 0, last = null;
+    
+    const seek = document.getElementById("seek");
+    const play = document.getElementById("play");
+    const speedSelect = document.getElementById("speed");
+    seek.max = moves.length;
+    [1, 2, 4, 8, 16, 32, 64, 128].forEach(s => speedSelect.add(new Option(s + " moves/s", s, false, s === speed)));
+    
+    function reset() {
+        towers = names.split("").map(() => []);
+        for (let disk = config.n; disk >= 1; disk--) towers[0].push(disk);
+        index = 0;
+    }
+    
+    // A packed move stores the source peg in the high nibble and the destination in the low one
+    function step() {
+        const move = moves[index++];
+        towers[move & 15].push(towers[move >> 4].pop());
+    }
+    
+    // Seeking backwards replays from the start; at a few bytes per move that is effectively instant
+    function goTo(target) {
+        if (target < index) reset();
+        while (index < target) step();
+        draw();
+    }
+    
+    function draw() {
+        const pegHeight = config.n * 28 + 20;
+        let html = "";
+        towers.forEach((tower, i) => {
+            html += '<div class="tower"><div class="peg" style="height: ' + pegHeight + 'px;"></div>';
+            for (let d = tower.length - 1; d >= 0; d--) {
+                const disk = tower[d];
+                const width = 30 + (disk / config.n) * config.maxDiskWidth;
+                const hue = Math.floor(120 + 240 * (disk / config.n));
+                html += '<div class="disk" style="width: ' + width + 'px; background-color: hsl(' + hue + ', 70%, 50%);">' + disk + '</div>';
+            }
+            html += '<div class="base" style="width: ' + (config.maxDiskWidth + 40) + 'px;"></div>';
+            html += '<div class="tower-label">' + names[i] + '</div></div>';
+        });
+        document.getElementById("board").innerHTML = html;
+        seek.value = index;
+        document.getElementById("position").textContent = "Move " + index + " of " + moves.length;
+        play.textContent = playing ? "Pause" : (index === moves.length ? "Replay" : "Play");
+    }
+    
+    function tick(now) {
+        if (playing) {
+            if (last !== null) carry += (now - last) * speed / 1000;
+            const due = Math.min(Math.floor(carry), moves.length - index);
+            carry -= due;
+            if (due > 0) goTo(index + due);
+            if (index === moves.length) { playing = false; draw(); }
         }
+        last = now;
+        requestAnimationFrame(tick);
+    }
+    
+    play.addEventListener("click", () => {
+        if (index === moves.length) goTo(0);
+        playing = !playing;
+        carry = 0;
+        draw();
     });
-    </script>
-    """
+    seek.addEventListener("input", () => { carry = 0; goTo(parseInt(seek.value)); });
+    speedSelect.addEventListener("change", () => { speed = parseInt(speedSelect.value); });
+    
+    reset();
+    draw();
+    requestAnimationFrame(tick);
+</script>
+""".replace("CONFIG", config)
     
-    st.components.v1.html(drag_drop_js, height=0)
\ No newline at end of file
+    st.iframe(replay_html, height=n * 28 + 220)
@@ -0,0 +1,168 @@
+import codecs
+from collections import namedtuple
+
+import numpy as np
+
+from game_logic import PackedState
+from moves import PEG_INDEX, PEG_NAMES, MOVE_STRINGS
+
+# Outcome of validating a submitted move sequence.
+# moves holds the packed moves (see moves.py) so replay can reuse them without parsing again;
+# error_index is the 0-based index of the first bad move and error_offset the 0-based character
+# offset of the first bad character, both None when every move was legal.
+ValidationResult = namedtuple("ValidationResult", ["moves", "error_index", "error", "solved", "error_offset"], defaults=(None,))
+
+# Characters read per chunk from pasted text or an uploaded file
+CHUNK_SIZE = 1 << 20
+
+# Move sequences are read as a stream of symbols: peg letters (A to P, either case), arrows and separators.
+# A move is a source peg, an optional arrow ("->", "-" or ">") and a destination peg; moves may be
+# separated by a single "," or ";". Whitespace (spaces, tabs, newlines) is ignored everywhere,
+# so "A->B, B->C", "A-B;B-C" and one "AB" per line are all accepted.
+_SEPARATOR, _DASH, _GREATER, _WHITESPACE, _OTHER = 16, 17, 18, 254, 255
+
+# Byte -> symbol lookup table; peg letters map to their peg index
+_SYMBOLS = np.full(256, _OTHER, dtype=np.uint8)
+for _peg, _name in enumerate(PEG_NAMES):
+    _SYMBOLS[ord(_name)] = _SYMBOLS[ord(_name.lower())] = _peg
+for _byte in b",;":
+    _SYMBOLS[_byte] = _SEPARATOR
+for _byte in b" \t\r\n\f\v":
+    _SYMBOLS[_byte] = _WHITESPACE
+_SYMBOLS[ord('-')], _SYMBOLS[ord('>')] = _DASH, _GREATER
+
+# Chunked move sequence parser. Each chunk is tokenized with a few array operations, so no
+# per-move strings are built and memory stays bounded by the chunk size plus the packed moves.
+# Only the symbols of a move split across two chunks are carried over to the next one.
+# Feed str or bytes chunks in order, then call finish(); the first error stops parsing and is
+# described by error, error_index (move) and error_offset (character).
+# Offsets count characters: str chunks are read one byte per character, and in bytes input every
+# byte before the first error is ASCII. A UTF-8 byte order mark at the start of bytes input is skipped.
+class MoveStreamParser:
+    def __init__(self, pegs=4):
+        self.pegs = pegs
+        self.count = 0
+        self.offset = 0
+        self.error = None
+        self.error_index = None
+        self.error_offset = None
+        # Non-whitespace symbols after the last complete move: symbol, raw character, offset
+        self._symbols = np.empty(0, dtype=np.uint8)
+        self._chars = np.empty(0, dtype=np.uint8)
+        self._offsets = np.empty(0, dtype=np.int64)
+
+    # Parse one chunk; returns (packed moves, character offset of each move) for the moves it completed
+    def feed(self, chunk):
+        if self.error:
+            return b"", np.empty(0, dtype=np.int64)
+        if isinstance(chunk, str):
+            chunk = chunk.encode("ascii", "replace")
+        elif not self.offset and chunk.startswith(codecs.BOM_UTF8):
+            chunk = chunk[len(codecs.BOM_UTF8):]
+        
+        data = np.frombuffer(chunk, dtype=np.uint8)
+        keep = np.flatnonzero(_SYMBOLS[data] != _WHITESPACE)
+        symbols = np.concatenate((self._symbols, _SYMBOLS[data[keep]]))
+        chars = np.concatenate((self._chars, data[keep]))
+        offsets = np.concatenate((self._offsets, keep + self.offset))
+        self.offset += len(data)
+        
+        # Pair up the peg letters as (source, destination) and check every other symbol against
+        # its place in the gap inside a move or between two moves
+        index = np.arange(len(symbols))
+        is_peg = symbols < _SEPARATOR
+        peg_positions = np.flatnonzero(is_peg)
+        pegs_before = np.cumsum(is_peg) - is_peg
+        gap = index - np.maximum.accumulate(np.where(is_peg, index, -1)) - 1
+        inside = pegs_before % 2 == 1
+        previous = np.concatenate(([_OTHER], symbols[:-1])).astype(np.uint8)
+        
+        arrow = ((gap == 0) & ((symbols == _DASH) | (symbols == _GREATER))) | ((gap == 1) & (symbols == _GREATER) & (previous == _DASH))
+        separator = (gap == 0) & (symbols == _SEPARATOR) & ((pegs_before > 0) | (self.count > 0))
+        well_formed = is_peg | (inside & arrow) | (~inside & separator)
+        in_range = ~is_peg | (symbols < self.pegs)
+        bad = np.flatnonzero(~(well_formed & in_range))
+        
+        complete = int(pegs_before[bad[0]]) // 2 if bad.size else len(peg_positions) // 2
+        sources = peg_positions[0:2 * complete:2]
+        destinations = peg_positions[1:2 * complete:2]
+        moves = (symbols[sources] << 4 | symbols[destinations]).tobytes()
+        move_offsets = offsets[sources]
+        
+        if bad.size:
+            position = bad[0]
+            start = peg_positions[2 * complete] if inside[position] else position
+            token = chars[start:position + 1].tobytes().decode("ascii", "replace")
+            if well_formed[position]:
+                error = f"Invalid peg at move {self.count + complete + 1}, character {offsets[position] + 1}: {token}. Use pegs A to {PEG_NAMES[self.pegs - 1]}."
+            else:
+                error = f"Invalid move format at move {self.count + complete + 1}, character {offsets[position] + 1}: {token}. Use 'Source->Destination' format."
+            self._fail(self.count + complete, int(offsets[position]), error)
+        else:
+            rest = peg_positions[2 * complete - 1] + 1 if complete else 0
+            self._symbols, self._chars, self._offsets = symbols[rest:], chars[rest:], offsets[rest:]
+        
+        self.count += complete
+        return moves, move_offsets
+
+    # Check the end of the input: the last move must be complete and at least one move given
+    def finish(self):
+        if self.error:
+            return
+        if (self._symbols < _SEPARATOR).any():
+            token = self._chars.tobytes().decode("ascii", "replace").lstrip(",;")
+            self._fail(self.count, self.offset, f"Incomplete move at move {self.count + 1}, end of input: {token}. Use 'Source->Destination' format.")
+        elif not self.count:
+            self._fail(0, self.offset, "No moves entered. Use 'Source->Destination' format.")
+
+    def _fail(self, index, offset, error):
+        self.error, self.error_index, self.error_offset = error, index, offset
+        self._symbols, self._chars, self._offsets = self._symbols[:0], self._chars[:0], self._offsets[:0]
+
+# Split pasted text, bytes or a binary file object (such as an upload) into chunks;
+# any other iterable is taken to already yield chunks
+def iter_chunks(source, size=CHUNK_SIZE):
+    if isinstance(source, (str, bytes, bytearray)):
+        for start in range(0, len(source), size):
+            yield bytes(source[start:start + size]) if isinstance(source, bytearray) else source[start:start + size]
+    elif hasattr(source, "read"):
+        while chunk := source.read(size):
+            yield chunk
+    else:
+        yield from source
+
+# Parse a move sequence from text, bytes, a file object or an iterable of chunks into packed moves.
+# Returns (moves, error_index, error)
+def parse_move_sequence(source, pegs=4):
+    parser = MoveStreamParser(pegs)
+    moves = bytearray()
+    for chunk in iter_chunks(source):
+        moves += parser.feed(chunk)[0]
+        if parser.error:
+            break
+    parser.finish()
+    return moves, parser.error_index, parser.error
+
+# Validate a whole submitted sequence: parse it chunk by chunk, replaying each chunk's moves on a
+# packed state as it arrives, and check the result. The first error in the input is reported,
+# whether it is malformed text or an illegal move.
+def validate_move_sequence(source, n, pegs=4, destination='C'):
+    parser = MoveStreamParser(pegs)
+    state = PackedState(n, pegs, destination=PEG_INDEX[destination])
+    moves = bytearray()
+    for chunk in iter_chunks(source):
+        chunk_moves, offsets = parser.feed(chunk)
+        illegal = state.apply_moves(chunk_moves)
+        if illegal is not None:
+            error_index = len(moves) + illegal
+            moves += chunk_moves
+            error = f"Invalid move {error_index + 1}, character {offsets[illegal] + 1}: {MOVE_STRINGS[moves[error_index]]}. Check your solution."
+            return ValidationResult(moves, error_index, error, False, int(offsets[illegal]))
+        moves += chunk_moves
+        if parser.error:
+            break
+    
+    parser.finish()
+    if parser.error:
+        return ValidationResult(moves, parser.error_index, parser.error, False, parser.error_offset)
+    return ValidationResult(moves, None, None, state.solved)